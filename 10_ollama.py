@@ -2,6 +2,7 @@ import requests
 import json
 import os
 import hashlib
+from near_duplicates import load_clusters
 def get_file_hash(file_path):
     hash_md5 = hashlib.md5()
     with open(file_path, "rb") as f:
@@ -39,15 +40,20 @@ def process_file(file_path, output_path):
         print(f"Processed: {file_path}")
     else:
         print(f"Error processing {file_path}:", response.status_code, response.text)
-def process_directory(input_dir, output_dir):
+def process_directory(input_dir, output_dir, clusters_file=None):
     processed_files_path = os.path.join(output_dir, "processed_files.json")
     processed_files = load_processed_files(processed_files_path)
+    # Generate only for the first member of each near-duplicate cluster
+    clusters = load_clusters(clusters_file) if clusters_file and os.path.exists(clusters_file) else {}
     for root, dirs, files in os.walk(input_dir):
         for file in files:
             if file.endswith('.txt'):
                 input_path = os.path.join(root, file)
                 relative_path = os.path.relpath(input_path, input_dir)
                 output_path = os.path.join(output_dir, relative_path)        
+                if clusters.get(relative_path, relative_path) != relative_path:
+                    print(f"Skipping near-duplicate of {clusters[relative_path]}: {relative_path}")
+                    continue
                 file_hash = get_file_hash(input_path)          
                 if relative_path in processed_files and processed_files[relative_path] == file_hash:
                     print(f"Skipping already processed file: {relative_path}")
@@ -58,4 +64,5 @@ def process_directory(input_dir, output_dir):
 if __name__ == "__main__":
     input_directory = "/home2/ /my_code/5_output"
     output_directory = "/home2/ /my_code/resultant"
-    process_directory(input_directory, output_directory)
\ No newline at end of file
+    clusters_file = "/home2/ /my_code/duplicate_clusters.json"
+    process_directory(input_directory, output_directory, clusters_file)
\ No newline at end of file
@@ -3,15 +3,20 @@ import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
 from sklearn.model_selection import train_test_split
+from near_duplicates import load_clusters, split_rows
 
 def read_file_content(file_path):
     with open(file_path, 'r', encoding='utf-8') as file:
         return file.read()
 
-def create_parquet_and_split(input_dir, resultant_dir, output_file, train_ratio=0.8):
+def create_parquet_and_split(input_dir, resultant_dir, output_file, train_ratio=0.8, clusters_file=None):
     instruction = "You are a reviewer for a research paper. Generate a questionnaire that analyzes any potential ethical considerations with the practices done in the research paper."
     data = []
     file_names = []
+    groups = []
+    # Near-duplicate papers (near_duplicates.py run on input_dir) share a
+    # group so they land on the same side of the split
+    clusters = load_clusters(clusters_file) if clusters_file and os.path.exists(clusters_file) else {}
     for root, _, files in os.walk(input_dir):
         rel_path = os.path.relpath(root, input_dir)
         resultant_subdir = os.path.join(resultant_dir, rel_path)
@@ -27,6 +32,8 @@ def create_parquet_and_split(input_dir, resultant_dir, output_file, train_ratio=
                     'output': output_content
                 })
                 file_names.append(file)
+                relative_path = os.path.relpath(input_file, input_dir)
+                groups.append(clusters.get(relative_path, relative_path))
     
     df = pd.DataFrame(data)
     
@@ -35,15 +42,17 @@ def create_parquet_and_split(input_dir, resultant_dir, output_file, train_ratio=
     pq.write_table(table, output_file)
     print(f"Parquet file '{output_file}' has been created successfully.")
     
-    # Split the file names into train and test sets
-    train_files, test_files = train_test_split(file_names, train_size=train_ratio, random_state=42)
+    # Split the groups into train and test sets, then take their files
+    train_rows, test_rows = split_rows(groups, lambda keys: train_test_split(keys, train_size=train_ratio, random_state=42))
+    train_files = [file_names[i] for i in train_rows]
+    test_files = [file_names[i] for i in test_rows]
     
     # Create a directory to store the output files
     output_dir = '/home2/ /my_code/split_data'
     os.makedirs(output_dir, exist_ok=True)
     # Save the train and test sets as Parquet files
-    train_df = df.iloc[[file_names.index(file) for file in train_files]]
-    test_df = df.iloc[[file_names.index(file) for file in test_files]]
+    train_df = df.iloc[train_rows]
+    test_df = df.iloc[test_rows]
     train_df.to_parquet(os.path.join(output_dir, 'train.parquet'))
     test_df.to_parquet(os.path.join(output_dir, 'test.parquet'))
     # Save the file names to train.txt and test.txt
@@ -55,9 +64,12 @@ def create_parquet_and_split(input_dir, resultant_dir, output_file, train_ratio=
             f.write(f"{file}\n")    
     print(f"Train set size: {len(train_files)}")
     print(f"Test set size: {len(test_files)}")
+    if clusters:
+        print(f"Kept {len(clusters)} near-duplicate papers together in {len(set(clusters.values()))} groups")
     print(f"Files saved in the '{output_dir}' directory.")
 
 input_dir = "/home2/ /my_code/4_output"
 resultant_dir = "/home2/ /my_code/resultant_numbered"
 output_file = "/home2/ /my_code/output.parquet"
-create_parquet_and_split(input_dir, resultant_dir, output_file)
\ No newline at end of file
+clusters_file = "/home2/ /my_code/duplicate_clusters.json"
+create_parquet_and_split(input_dir, resultant_dir, output_file, clusters_file=clusters_file)
\ No newline at end of file
@@ -1,5 +1,7 @@
 import os
 import json
+import argparse
+from shard_store import iter_records
 
 def process_ethics_files(source_dir, target_dir):
     for root, dirs, files in os.walk(source_dir):
@@ -26,7 +28,26 @@ def process_ethics_files(source_dir, target_dir):
                 with open(target_file, 'w') as txt_file:
                     txt_file.write(f"{heading}\n\n{text}")
                 print(f"Processed {source_file} to {target_file}")
+
+def process_ethics_shards(shard_dir, target_dir):
+    for record in iter_records(shard_dir):
+        if not record['ethics']:
+            continue
+        target_file = os.path.join(target_dir, record['volume'], f"{record['id']}.txt")
+        os.makedirs(os.path.dirname(target_file), exist_ok=True)
+        heading = record['ethics'][0].get('heading', '')
+        text = record['ethics'][0].get('text', '')
+        with open(target_file, 'w') as txt_file:
+            txt_file.write(f"{heading}\n\n{text}")
+        print(f"Processed {record['volume']}/{record['id']} to {target_file}")
+
+parser = argparse.ArgumentParser(description='Write each paper\'s first ethics section as text')
+parser.add_argument('--shards', help='Read JSONL shards from 2_pdf_parser.py --shard-dir instead of 1(a)_output')
+args = parser.parse_args()
 source_directory = "1(a)_output"
 target_directory = "6_output"
 
-process_ethics_files(source_directory, target_directory)
\ No newline at end of file
+if args.shards:
+    process_ethics_shards(args.shards, target_directory)
+else:
+    process_ethics_files(source_directory, target_directory)
\ No newline at end of file
@@ -1,5 +1,15 @@
 import os
+import csv
+import hashlib
+import argparse
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from file_state import fingerprint, load_state, save_state
+
+MANIFEST_FIELDS = ['paper_id', 'volume', 'year', 'url', 'paper_hash', 'source']
+
+def paper_url(url_content):
+    return f"https://aclanthology.org/{url_content}.pdf"
 
 def process_xml_file(filename):
     tree = ET.parse(filename)
@@ -9,7 +19,7 @@ def process_xml_file(filename):
         url_element = paper.find('url')
         if url_element is not None and url_element.text:
             url_content = url_element.text
-            full_url = f"https://aclanthology.org/{url_content}.pdf"
+            full_url = paper_url(url_content)
             urls.append(full_url)
     return urls
 def save_urls(filename, urls):
@@ -19,9 +29,135 @@ def save_urls(filename, urls):
         for url in urls:
             f.write(f"{url}\n")
     print(f"URLs saved to {output_filename}")
-# Process all XML files in the current directory
-for filename in os.listdir('.'):
-    if filename.endswith('.xml'):
-        print(f"Processing {filename}...")
-        urls = process_xml_file(filename)
-        save_urls(filename, urls)
+
+def stream_xml_file(filename):
+    # Streaming variant of process_xml_file: each <paper> is dropped from the
+    # tree as soon as it is read, so memory does not grow with the volume size.
+    rows = []
+    source = os.path.basename(filename)
+    collection_id = os.path.splitext(source)[0]
+    volume_id = collection_id
+    volume_elem = None
+    year = ''
+    for event, elem in ET.iterparse(filename, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == 'collection':
+                collection_id = elem.get('id', collection_id)
+            elif elem.tag == 'volume':
+                volume_elem = elem
+                volume_id = f"{collection_id}-{elem.get('id')}" if elem.get('id') else collection_id
+                year = ''
+            continue
+        if elem.tag == 'year' and not year:
+            year = (elem.text or '').strip()
+        elif elem.tag == 'paper':
+            url_element = elem.find('url')
+            if url_element is not None and url_element.text:
+                url_content = url_element.text.strip()
+                # The tail is the whitespace after </paper>, which depends on
+                # where iterparse's read chunks fall, so it is left out of the hash
+                elem.tail = None
+                rows.append({
+                    'paper_id': url_content,
+                    'volume': volume_id,
+                    'year': year,
+                    'url': paper_url(url_content),
+                    'paper_hash': hashlib.sha1(ET.tostring(elem)).hexdigest(),
+                    'source': source,
+                })
+            elem.clear()
+            if volume_elem is not None:
+                volume_elem.remove(elem)
+        elif elem.tag == 'volume':
+            elem.clear()
+            volume_elem = None
+    return rows
+
+def volume_state_path(manifest_path):
+    return f"{manifest_path}.volumes.json"
+
+def load_volume_state(manifest_path):
+    return load_state(volume_state_path(manifest_path))
+
+def load_manifest(manifest_path):
+    with open(manifest_path, 'r', newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def write_manifest(manifest_path, rows):
+    with open(manifest_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+def harvest_manifest(xml_dir, manifest_path, workers=None, previous_manifest=None, delta_path=None):
+    xml_files = sorted(os.path.join(xml_dir, f) for f in os.listdir(xml_dir) if f.endswith('.xml'))
+    previous_state = load_volume_state(previous_manifest) if previous_manifest else {}
+    previous_rows = load_manifest(previous_manifest) if previous_manifest else []
+
+    state = {}
+    changed_files = []
+    for path in xml_files:
+        previous = previous_state.get(os.path.basename(path))
+        current = fingerprint(path, previous)
+        state[os.path.basename(path)] = current
+        if previous is None or previous['sha256'] != current['sha256']:
+            changed_files.append(path)
+    print(f"{len(changed_files)} of {len(xml_files)} XML files are new or changed")
+
+    # Rows of unchanged volumes are carried over from the previous manifest
+    changed_sources = {os.path.basename(path) for path in changed_files}
+    rows_by_source = {}
+    for row in previous_rows:
+        if row.get('source') in state and row['source'] not in changed_sources:
+            rows_by_source.setdefault(row['source'], []).append(row)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for filename, rows in zip(changed_files, executor.map(stream_xml_file, changed_files)):
+            print(f"Processed {filename}: {len(rows)} papers")
+            rows_by_source[os.path.basename(filename)] = rows
+
+    previous_hashes = {row['paper_id']: row.get('paper_hash') for row in previous_rows}
+    seen = set()
+    manifest_rows = []
+    delta_rows = []
+    for path in xml_files:
+        for row in rows_by_source.get(os.path.basename(path), []):
+            if row['url'] in seen:
+                continue
+            seen.add(row['url'])
+            manifest_rows.append(row)
+            if previous_hashes.get(row['paper_id']) != row['paper_hash']:
+                delta_rows.append(row)
+
+    write_manifest(manifest_path, manifest_rows)
+    save_state(volume_state_path(manifest_path), state, indent=1)
+    print(f"Manifest with {len(manifest_rows)} URLs saved to {manifest_path}")
+    if delta_path:
+        write_manifest(delta_path, delta_rows)
+        print(f"Delta with {len(delta_rows)} new or changed URLs saved to {delta_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Collect ACL Anthology PDF URLs from volume XML files')
+    parser.add_argument('--xml-dir', default='.', help='Directory containing the anthology XML files')
+    parser.add_argument('--manifest', help='Write one deduplicated CSV manifest (paper_id, volume, year, url) instead of per-file URL lists')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes for --manifest')
+    parser.add_argument('--since', help='Previous manifest; only re-read XML files that changed since it')
+    parser.add_argument('--delta', help='With --since, also write a manifest of only the new or changed URLs')
+    args = parser.parse_args()
+
+    if args.since and not args.manifest:
+        parser.error('--since requires --manifest')
+    if args.delta and not args.since:
+        parser.error('--delta requires --since')
+    if args.manifest:
+        harvest_manifest(args.xml_dir, args.manifest, args.workers, args.since, args.delta)
+        return
+    # Process all XML files in the given directory
+    for filename in os.listdir(args.xml_dir):
+        if filename.endswith('.xml'):
+            print(f"Processing {filename}...")
+            filename = os.path.join(args.xml_dir, filename)
+            urls = process_xml_file(filename)
+            save_urls(filename, urls)
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,303 @@
 import os
+import csv
+import shutil
+import hashlib
+import uuid
+import random
+import argparse
 import requests
+from requests.adapters import HTTPAdapter
 import scipdf
 import json
+import queue
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
 from urllib.parse import urlparse
 import warnings
 from bs4 import XMLParsedAsHTMLWarning
+from shard_store import ShardWriter, COLD_DIR, project_article, write_cold
+from fallback_parser import parse_pdf_text_layer
+from tei_parser import tei_to_dict
+from grobid_pool import PARSE_TIMEOUT, GrobidPool
 
 warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
 
-def download_pdf(url, filename):
-    response = requests.get(url)
-    if response.status_code == 200:
-        with open(filename, 'wb') as f:
-            f.write(response.content)
+DOWNLOAD_CONCURRENCY = 4
+DOWNLOAD_TIMEOUT = 60
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+PARSE_WORKERS = 2
+QUEUE_SIZE = 8
+STATE_DB = 'crawl_state.db'
+PDF_CACHE_SIZE_GB = 20
+GROBID_URL = "http://localhost:8070"
+THROTTLE_STATUSES = {429, 503}
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 300.0
+# GROBID requests abandoned after --parse-budget that may still be running;
+# parse workers wait for one to finish rather than start more
+MAX_ABANDONED_PARSES = 4
+
+def make_session(concurrency=DOWNLOAD_CONCURRENCY):
+    # One keep-alive connection pool shared by all download threads
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+class Throttled(Exception):
+    def __init__(self, url, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code} for {url}")
+        self.retry_after = retry_after
+
+def retry_after_seconds(value):
+    # Retry-After is either a number of seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def check_throttled(url, response):
+    if response.status_code in THROTTLE_STATUSES:
+        raise Throttled(url, response.status_code, retry_after_seconds(response.headers.get('Retry-After')))
+
+class HostLimiter:
+    # AIMD concurrency limit for one host: +1/limit per successful request,
+    # halved on 429/503, and nobody starts a request until the Retry-After
+    # or backoff delay has passed. Requests already in flight when the limit
+    # was halved were sent under the old limit, so their throttles do not
+    # halve it again: the limit drops at most once per congestion window.
+    def __init__(self, max_limit, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        # Number of decreases so far; each request remembers the value it started under
+        self.window = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while True:
+                wait = self.blocked_until - time.time()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return self.window
+                self.cond.wait(wait if wait > 0 else None)
+
+    def release(self):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def on_success(self):
+        with self.cond:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.cond.notify_all()
+
+    def on_throttle(self, retry_after, attempt, window):
+        delay = self.backoff_base * 2 ** attempt * random.uniform(0.5, 1.5)
+        delay = min(self.backoff_max, max(delay, retry_after or 0.0))
+        with self.cond:
+            if window == self.window:
+                self.limit = max(1.0, self.limit / 2)
+                self.window += 1
+            self.blocked_until = max(self.blocked_until, time.time() + delay)
+            print(f"Throttled, backing off {delay:.1f}s; concurrency limit now {int(self.limit)}")
+
+class RateController:
+    def __init__(self, max_limit, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE):
+        self.max_limit = max_limit
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def host(self, url):
+        netloc = urlparse(url).netloc
+        with self.lock:
+            if netloc not in self.hosts:
+                self.hosts[netloc] = HostLimiter(self.max_limit, self.backoff_base)
+            return self.hosts[netloc]
+
+    def call(self, url, fetch):
+        limiter = self.host(url)
+        for attempt in range(self.max_retries + 1):
+            window = limiter.acquire()
+            try:
+                result = fetch()
+            except Throttled as e:
+                limiter.on_throttle(e.retry_after, attempt, window)
+                continue
+            finally:
+                limiter.release()
+            # 404s and broken downloads say nothing about the host's capacity
+            if result:
+                limiter.on_success()
+            return result
+        print(f"Giving up on {url} after {self.max_retries} throttled retries")
+        return False
+
+def write_stream(response, path):
+    # Write a streamed response body chunk by chunk and return its sha256
+    sha = hashlib.sha256()
+    with open(path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            f.write(chunk)
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def download_pdf(url, filename, session=requests, timeout=DOWNLOAD_TIMEOUT):
+    # The body is streamed to a .part file in fixed-size chunks, so memory per
+    # download stays at DOWNLOAD_CHUNK_SIZE whatever the PDF size, and the
+    # parser only ever sees complete files.
+    part_path = f"{filename}.part"
+    try:
+        with session.get(url, timeout=timeout, stream=True) as response:
+            check_throttled(url, response)
+            if response.status_code != 200:
+                return False
+            write_stream(response, part_path)
+        os.replace(part_path, filename)
         return True
-    return False
+    except (requests.RequestException, OSError) as e:
+        print(f"Download error for {url}: {e}")
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        return False
 
-def parse_pdf(pdf_file):
+class PdfCache:
+    # Content-addressed PDF store: objects/<sha256>.pdf plus an SQLite index
+    # mapping each URL to its object and validators (ETag/Last-Modified).
+    # Objects are evicted least-recently-used first once the cap is exceeded.
+    def __init__(self, cache_dir, max_bytes, revalidate=True):
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.tmp_dir = os.path.join(cache_dir, 'tmp')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.revalidate = revalidate
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(cache_dir, 'index.db'), check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, sha256 TEXT, etag TEXT, last_modified TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS objects (sha256 TEXT PRIMARY KEY, size INTEGER, last_used REAL)")
+        self.conn.commit()
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, f"{digest}.pdf")
+
+    def lookup(self, url):
+        with self.lock:
+            row = self.conn.execute("SELECT sha256, etag, last_modified FROM urls WHERE url = ?", (url,)).fetchone()
+        if row is None or not os.path.exists(self.object_path(row[0])):
+            return None
+        return row
+
+    def place(self, source, filename):
+        # Hard-link source to where the parser expects the PDF; False if
+        # source is gone (another thread evicted it)
+        if os.path.exists(filename):
+            os.remove(filename)
+        try:
+            os.link(source, filename)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            try:
+                shutil.copyfile(source, filename)
+            except FileNotFoundError:
+                return False
+        return True
+
+    def materialize(self, digest, filename):
+        with self.lock:
+            self.conn.execute("UPDATE objects SET last_used = ? WHERE sha256 = ?", (time.time(), digest))
+            self.conn.commit()
+        return self.place(self.object_path(digest), filename)
+
+    def store(self, url, part_path, digest, etag, last_modified):
+        size = os.path.getsize(part_path)
+        with self.lock:
+            if os.path.exists(self.object_path(digest)):
+                os.remove(part_path)
+            else:
+                os.replace(part_path, self.object_path(digest))
+            self.conn.execute("INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?)", (url, digest, etag, last_modified))
+            self.conn.execute("INSERT OR REPLACE INTO objects VALUES (?, ?, ?)", (digest, size, time.time()))
+            self.conn.commit()
+            self.evict(keep=digest)
+
+    def evict(self, keep):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for digest, size in self.conn.execute("SELECT sha256, size FROM objects WHERE sha256 != ? ORDER BY last_used", (keep,)).fetchall():
+            if total <= self.max_bytes:
+                break
+            if os.path.exists(self.object_path(digest)):
+                os.remove(self.object_path(digest))
+            self.conn.execute("DELETE FROM objects WHERE sha256 = ?", (digest,))
+            self.conn.execute("DELETE FROM urls WHERE sha256 = ?", (digest,))
+            total -= size
+        self.conn.commit()
+
+    def fetch(self, url, filename, session=requests, timeout=DOWNLOAD_TIMEOUT):
+        # Unchanged papers are served from the cache: without revalidation no
+        # request is made, otherwise a conditional GET that returns 304.
+        # An object evicted between lookup and link counts as a cache miss.
+        cached = self.lookup(url)
+        part_path = os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}.part")
+        try:
+            if cached is not None and not self.revalidate:
+                if self.materialize(cached[0], filename):
+                    return True
+                cached = None
+            headers = {}
+            if cached is not None:
+                if cached[1]:
+                    headers['If-None-Match'] = cached[1]
+                if cached[2]:
+                    headers['If-Modified-Since'] = cached[2]
+            with session.get(url, timeout=timeout, stream=True, headers=headers) as response:
+                check_throttled(url, response)
+                if response.status_code == 304 and cached is not None:
+                    if self.materialize(cached[0], filename):
+                        return True
+                    # Nothing left to serve the 304 from: ask again without validators
+                    return self.fetch(url, filename, session, timeout)
+                if response.status_code != 200:
+                    return False
+                digest = write_stream(response, part_path)
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+            # Linked before store() so a concurrent eviction cannot take it first
+            self.place(part_path, filename)
+            self.store(url, part_path, digest, etag, last_modified)
+            return True
+        except (requests.RequestException, OSError) as e:
+            print(f"Download error for {url}: {e}")
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return False
+
+def parse_pdf(pdf_file, grobid_url=GROBID_URL, fast_tei=False):
     try:
-        result = scipdf.parse_pdf_to_dict(pdf_file)
+        if fast_tei:
+            tei = scipdf.parse_pdf(pdf_file, fulltext=True, soup=False, grobid_url=grobid_url)
+            result = tei_to_dict(tei) if tei is not None else None
+        else:
+            result = scipdf.parse_pdf_to_dict(pdf_file, grobid_url=grobid_url)
         if isinstance(result, tuple):
             return result[0], None
         else:
@@ -26,11 +305,41 @@ def parse_pdf(pdf_file):
     except Exception as e:
         return None, str(e)
 
-def save_ethics_section(json_data, output_file):
+def parse_pdf_within(pdf_file, budget, fast_tei=False, slots=None):
+    # Run parse_pdf in a helper thread and give up after budget seconds.
+    # The abandoned GROBID request keeps running in the background, holding
+    # one of slots until it returns, so the helper threads stay bounded.
+    result = {}
+
+    def parse():
+        try:
+            result['value'] = parse_pdf(pdf_file, fast_tei=fast_tei)
+        finally:
+            if slots is not None:
+                slots.release()
+
+    # GROBID requests have no timeout of their own, so hung ones may hold
+    # their slots for good; waiting longer than the budget for a slot would
+    # stall the pipeline
+    deadline = time.perf_counter() + budget
+    if slots is not None and not slots.acquire(timeout=budget):
+        return None, f"GROBID exceeded the {budget}s parse budget (no free parse slot)"
+    thread = threading.Thread(target=parse, daemon=True)
+    thread.start()
+    thread.join(max(0.0, deadline - time.perf_counter()))
+    if thread.is_alive():
+        return None, f"GROBID exceeded the {budget}s parse budget"
+    return result['value']
+
+def extract_ethics_sections(json_data):
     ethics_sections = []
     for section in json_data.get('sections', []):
         if 'ethic' in section.get('heading', '').lower():
             ethics_sections.append(section)
+    return ethics_sections
+
+def save_ethics_section(json_data, output_file):
+    ethics_sections = extract_ethics_sections(json_data)
    
     if ethics_sections:
         with open(output_file, 'w', encoding='utf-8') as f:
@@ -43,49 +352,379 @@ def log_error(pdf_name, error_message):
     with open('errors.txt', 'a') as f:
         f.write(f"{pdf_name}: {error_message}\n")
 
-def process_url_file(file_path):
+class CrawlState:
+    # Per-URL crawl status kept in SQLite so a preempted run can resume.
+    # Completed URLs are cached in a dict with the manifest paper_hash they
+    # were parsed at, making the skip check O(1); a manifest row whose hash
+    # changed (a 1_links.py delta) is not considered done.
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_state (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                output_dir TEXT,
+                output_path TEXT,
+                error_class TEXT,
+                error TEXT,
+                download_seconds REAL,
+                parse_seconds REAL,
+                updated_at TEXT
+            )""")
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(crawl_state)")}
+        if 'paper_hash' not in columns:
+            self.conn.execute("ALTER TABLE crawl_state ADD COLUMN paper_hash TEXT")
+        self.conn.commit()
+        self.done = dict(self.conn.execute("SELECT url, paper_hash FROM crawl_state WHERE status = 'done'"))
+
+    def is_done(self, url, paper_hash=None):
+        # Without a hash (plain URL lists) any completed row counts
+        if url not in self.done:
+            return False
+        return paper_hash is None or self.done[url] == paper_hash
+
+    def record(self, item, output_dir, status, output_path=None, error_class=None):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO crawl_state (url, status, output_dir, output_path, error_class, error, "
+            "download_seconds, parse_seconds, updated_at, paper_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), ?)",
+            (item['url'], status, output_dir, output_path, error_class, item.get('error'),
+             item.get('download_seconds'), item.get('parse_seconds'), item.get('paper_hash')))
+        self.conn.commit()
+        if status == 'done':
+            self.done[item['url']] = item.get('paper_hash')
+
+    def failed_urls(self):
+        # Failed URLs grouped by the output directory they were crawled into,
+        # plus the paper_hash each was queued with (as read_manifest returns)
+        volumes = {}
+        paper_hashes = {}
+        for url, output_dir, paper_hash in self.conn.execute(
+                "SELECT url, output_dir, paper_hash FROM crawl_state WHERE status = 'failed'"):
+            volumes.setdefault(output_dir, []).append(url)
+            if paper_hash:
+                paper_hashes[url] = paper_hash
+        return volumes, paper_hashes
+
+class CrawlMetrics:
+    # Appends one CSV row per measurement (download/parse/write latency,
+    # download bytes, queue depths) and prints percentiles at the end.
+    def __init__(self, metrics_path):
+        self.file = open(metrics_path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['time', 'stage', 'url', 'value', 'bytes'])
+        self.values = {}
+        self.total_bytes = 0
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def record(self, stage, value, url='', nbytes=''):
+        with self.lock:
+            self.writer.writerow([f"{time.time():.3f}", stage, url, f"{value:.6f}", nbytes])
+            self.values.setdefault(stage, []).append(value)
+            if nbytes:
+                self.total_bytes += nbytes
+
+    def record_item(self, item, write_seconds, parse_depth, write_depth):
+        self.record('download_seconds', item['download_seconds'], item['url'], item.get('bytes', ''))
+        if 'parse_seconds' in item:
+            self.record('parse_seconds', item['parse_seconds'], item['url'])
+        if write_seconds is not None:
+            self.record('write_seconds', write_seconds, item['url'])
+        self.record('parse_queue_depth', parse_depth)
+        self.record('write_queue_depth', write_depth)
+
+    def close(self):
+        self.file.close()
+        elapsed = time.time() - self.started
+        print("Stage timings (p50 / p95 / p99 / max):")
+        for stage, values in self.values.items():
+            values = sorted(values)
+            p50, p95, p99 = (percentile(values, p) for p in (50, 95, 99))
+            print(f"  {stage}: n={len(values)} {p50:.3f} / {p95:.3f} / {p99:.3f} / {values[-1]:.3f}")
+        if elapsed:
+            print(f"  downloaded {self.total_bytes / 1024 ** 2:.1f} MiB at {self.total_bytes / 1024 ** 2 / elapsed:.2f} MiB/s")
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile of an already sorted list
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+def read_url_file(file_path):
     base_name = os.path.splitext(os.path.basename(file_path))[0]
-    output_dir = os.path.join('output', base_name)
-    os.makedirs(output_dir, exist_ok=True)
     with open(file_path, 'r') as f:
-        urls = f.read().splitlines()
-    for url in urls:
-        parsed_url = urlparse(url)
-        pdf_name = os.path.splitext(os.path.basename(parsed_url.path))[0]
-        pdf_name = pdf_name.replace('.', '_')
-        pdf_path = os.path.join(output_dir, f"{pdf_name}.pdf")
-        if download_pdf(url, pdf_path):
-            article_dict, error = parse_pdf(pdf_path)
-            if article_dict is not None:
-                json_output = os.path.join(output_dir, f"{pdf_name}.json")
-                with open(json_output, 'w', encoding='utf-8') as f:
-                    json.dump(article_dict, f, ensure_ascii=False, indent=4)
-               
-                ethics_output = os.path.join(output_dir, f"{pdf_name}_ethics.json")
-                save_ethics_section(article_dict, ethics_output)
-               
-                print(f"Processed: {url}")
-                print(f"Output saved to: {json_output}")
+        return os.path.join('output', base_name), f.read().splitlines()
+
+def read_manifest(manifest_path):
+    # Group the URLs of a 1_links.py --manifest file by volume, with each
+    # URL's paper_hash (None for manifests written before it existed)
+    volumes = {}
+    paper_hashes = {}
+    with open(manifest_path, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            volumes.setdefault(row['volume'], []).append(row['url'])
+            paper_hashes[row['url']] = row.get('paper_hash') or None
+    return volumes, paper_hashes
+
+def pdf_name_for(url):
+    parsed_url = urlparse(url)
+    pdf_name = os.path.splitext(os.path.basename(parsed_url.path))[0]
+    return pdf_name.replace('.', '_')
+
+def write_article(url, pdf_name, article_dict, output_dir, shard=None, write_files=True, cold_shard=None, project=False):
+    hot_article = project_article(article_dict) if project else article_dict
+    json_output = None
+    if write_files:
+        json_output = os.path.join(output_dir, f"{pdf_name}.json")
+        with open(json_output, 'w', encoding='utf-8') as f:
+            json.dump(hot_article, f, ensure_ascii=False, indent=4)
+        if project:
+            write_cold(json_output, article_dict)
+       
+        ethics_output = os.path.join(output_dir, f"{pdf_name}_ethics.json")
+        save_ethics_section(article_dict, ethics_output)
+    if shard is not None:
+        shard.write(pdf_name, hot_article, extract_ethics_sections(article_dict))
+        if cold_shard is not None:
+            cold_shard.write(pdf_name, article_dict, [])
+        json_output = json_output or shard.data.name
+   
+    print(f"Processed: {url}")
+    print(f"Output saved to: {json_output}")
+    return json_output
+
+def run_stage(target, workers, downstream, sentinels):
+    threads = [threading.Thread(target=target, daemon=True) for _ in range(workers)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        # Always release the next stage, even if a worker died
+        for _ in range(sentinels):
+            downstream.put(None)
+
+def process_volumes(volumes, session, args, state=None, cache=None, grobid=None, rates=None, metrics=None, paper_hashes=None):
+    # Three stages joined by bounded queues: download threads -> parse
+    # threads (GROBID) -> this thread writing JSON. A full queue blocks the
+    # stage feeding it, so downloads never run more than queue_size PDFs
+    # ahead of the parsers. One pipeline spans every (output_dir, urls)
+    # volume, so small volumes do not drain the queues at their boundaries.
+    paper_hashes = paper_hashes or {}
+    url_queue = queue.Queue()
+    for output_dir, urls in volumes:
+        if state is not None and not args.reparse:
+            skipped = len(urls)
+            urls = [url for url in urls if not state.is_done(url, paper_hashes.get(url))]
+            skipped -= len(urls)
+            if skipped:
+                print(f"Skipping {skipped} URLs already completed in {output_dir}")
+        os.makedirs(output_dir, exist_ok=True)
+        for url in urls:
+            url_queue.put((url, output_dir))
+    parse_queue = queue.Queue(maxsize=args.queue_size)
+    write_queue = queue.Queue(maxsize=args.queue_size)
+    parse_slots = threading.BoundedSemaphore(args.parse_workers + MAX_ABANDONED_PARSES)
+    shards = {}
+
+    def shards_for(output_dir):
+        # (shard, cold shard) of a volume, opened on its first article
+        if not args.shard_dir:
+            return None, None
+        if output_dir not in shards:
+            volume = os.path.basename(output_dir)
+            cold_shard = ShardWriter(os.path.join(args.shard_dir, COLD_DIR), volume) if args.project else None
+            shards[output_dir] = (ShardWriter(args.shard_dir, volume), cold_shard)
+        return shards[output_dir]
+
+    def download_worker():
+        while True:
+            try:
+                url, output_dir = url_queue.get_nowait()
+            except queue.Empty:
+                return
+            pdf_name = pdf_name_for(url)
+            item = {'url': url, 'output_dir': output_dir, 'pdf_name': pdf_name,
+                    'pdf_path': os.path.join(output_dir, f"{pdf_name}.pdf"), 'paper_hash': paper_hashes.get(url)}
+            start = time.perf_counter()
+            try:
+                if cache is not None:
+                    fetch = lambda: cache.fetch(url, item['pdf_path'], session, args.timeout)
+                else:
+                    fetch = lambda: download_pdf(url, item['pdf_path'], session, args.timeout)
+                item['downloaded'] = rates.call(url, fetch) if rates is not None else fetch()
+                if item['downloaded']:
+                    item['bytes'] = os.path.getsize(item['pdf_path'])
+            except Exception as e:
+                item['downloaded'] = False
+                item['error'] = f"{type(e).__name__}: {e}"
+            item['download_seconds'] = time.perf_counter() - start
+            parse_queue.put(item)
+
+    def parse_item(item):
+        start = time.perf_counter()
+        if grobid is not None:
+            item['article'], item['error'] = grobid.parse(item['pdf_path'])
+        elif args.parse_budget:
+            item['article'], item['error'] = parse_pdf_within(item['pdf_path'], args.parse_budget, args.tei_fast_path, parse_slots)
+        else:
+            item['article'], item['error'] = parse_pdf(item['pdf_path'], fast_tei=args.tei_fast_path)
+        if item['article'] is None and args.fallback:
+            print(f"GROBID failed on {item['pdf_path']} ({item['error']}), using the text-layer parser")
+            article, error = parse_pdf_text_layer(item['pdf_path'])
+            if article is not None:
+                item['article'] = article
+            else:
+                item['error'] = f"{item['error']}; text-layer fallback: {error}"
+        item['parse_seconds'] = time.perf_counter() - start
+        os.remove(item['pdf_path'])
+        print(f"PDF file deleted: {item['pdf_path']}")
+
+    def parse_worker():
+        while True:
+            item = parse_queue.get()
+            if item is None:
+                return
+            if not item['downloaded']:
+                item.setdefault('error', "Failed to download")
+                write_queue.put(item)
+                continue
+            try:
+                parse_item(item)
+            except Exception as e:
+                item.setdefault('article', None)
+                item['error'] = f"{type(e).__name__}: {e}"
+            write_queue.put(item)
+
+    stages = [
+        threading.Thread(target=run_stage, args=(download_worker, args.concurrency, parse_queue, args.parse_workers), daemon=True),
+        threading.Thread(target=run_stage, args=(parse_worker, args.parse_workers, write_queue, 1), daemon=True),
+    ]
+    for stage in stages:
+        stage.start()
+    while True:
+        item = write_queue.get()
+        if item is None:
+            break
+        output_dir = item['output_dir']
+        write_seconds = None
+        if not item['downloaded']:
+            print(f"Failed to download: {item['url']}")
+            log_error(item['pdf_name'], item['error'])
+            if state is not None:
+                state.record(item, output_dir, 'failed', error_class='download')
+        elif item['article'] is not None:
+            start = time.perf_counter()
+            try:
+                shard, cold_shard = shards_for(output_dir)
+                json_output = write_article(item['url'], item['pdf_name'], item['article'], output_dir, shard,
+                                            not args.shards_only, cold_shard, args.project)
+            except Exception as e:
+                item['error'] = f"{type(e).__name__}: {e}"
+                print(f"Failed to write: {item['url']}")
+                log_error(item['pdf_name'], item['error'])
+                if state is not None:
+                    state.record(item, output_dir, 'failed', error_class='write')
             else:
-                print(f"Failed to parse PDF: {pdf_path}")
-                log_error(pdf_name, error)
-            
-            os.remove(pdf_path)
-            print(f"PDF file deleted: {pdf_path}")
+                write_seconds = time.perf_counter() - start
+                if state is not None:
+                    state.record(item, output_dir, 'done', json_output)
         else:
-            print(f"Failed to download: {url}")
-            log_error(pdf_name, "Failed to download")
+            print(f"Failed to parse PDF: {item['pdf_path']}")
+            log_error(item['pdf_name'], item['error'])
+            if state is not None:
+                state.record(item, output_dir, 'failed', error_class='parse')
+        if metrics is not None:
+            metrics.record_item(item, write_seconds, parse_queue.qsize(), write_queue.qsize())
+    for stage in stages:
+        stage.join()
+    for shard, cold_shard in shards.values():
+        shard.close()
+        if cold_shard is not None:
+            cold_shard.close()
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Download anthology PDFs and parse them with GROBID')
+    parser.add_argument('--manifest', help='CSV manifest from 1_links.py --manifest (default: every .txt URL list in dataset/)')
+    parser.add_argument('--concurrency', type=int, default=DOWNLOAD_CONCURRENCY, help='Maximum number of parallel downloads')
+    parser.add_argument('--timeout', type=float, default=DOWNLOAD_TIMEOUT, help='Per-request download timeout in seconds')
+    parser.add_argument('--max-retries', type=int, default=MAX_RETRIES, help='Retries per URL after HTTP 429/503 before giving up')
+    parser.add_argument('--backoff-base', type=float, default=BACKOFF_BASE, help='Base delay in seconds of the jittered exponential backoff')
+    parser.add_argument('--parse-workers', type=int, default=PARSE_WORKERS, help='Number of parallel GROBID parse workers')
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE, help='Capacity of the download->parse and parse->write queues')
+    parser.add_argument('--state-db', default=STATE_DB, help='SQLite file recording per-URL status; completed URLs are skipped on rerun')
+    parser.add_argument('--no-state', action='store_true', help='Do not read or write the state database')
+    parser.add_argument('--reparse', action='store_true', help='Process every URL even if the state database marks it done (e.g. re-parse from --pdf-cache --cache-only); results are still recorded')
+    parser.add_argument('--pdf-cache', help='Directory for a content-addressed PDF cache (default: PDFs are not kept)')
+    parser.add_argument('--pdf-cache-size-gb', type=float, default=PDF_CACHE_SIZE_GB, help='Size cap of the PDF cache; least recently used PDFs are evicted')
+    parser.add_argument('--cache-only', action='store_true', help='Use cached PDFs without revalidating them against the server')
+    parser.add_argument('--grobid-url', action='append', help='GROBID instance to parse with; repeat to spread load over several (default: %s in-process)' % GROBID_URL)
+    parser.add_argument('--workers-per-grobid', type=int, default=1, help='Worker processes per --grobid-url; sets the number of parse workers')
+    parser.add_argument('--parse-timeout', type=float, default=PARSE_TIMEOUT, help='Wall-clock limit per PDF with --grobid-url; stuck workers are killed and respawned')
+    parser.add_argument('--tei-fast-path', action='store_true', help='Convert GROBID TEI with the streaming tei_parser instead of BeautifulSoup')
+    parser.add_argument('--fallback', action='store_true', help='Parse with the pypdf text layer when GROBID fails or exceeds --parse-budget')
+    parser.add_argument('--parse-budget', type=float, help='Seconds to wait for GROBID per PDF before giving up on it (or, with --fallback, using the text layer)')
+    parser.add_argument('--shard-dir', help='Also append every article to <shard-dir>/<volume>.jsonl with an id->offset index')
+    parser.add_argument('--shards-only', action='store_true', help='With --shard-dir, skip the per-paper .json and _ethics.json files')
+    parser.add_argument('--project', action='store_true', help='Keep only title/authors/abstract/section heading+text in the outputs; the full record goes to a gzipped cold copy')
+    parser.add_argument('--metrics', help='CSV file for per-paper stage timings, download bytes and queue depths; percentiles are printed at the end')
+    parser.add_argument('--retry-failed', action='store_true', help='Only re-run the URLs recorded as failed in the state database')
+    return parser.parse_args(argv)
+
+def run(args, session, state, cache, grobid, rates, metrics):
+    if args.retry_failed:
+        if state is None:
+            print("Error: --retry-failed needs the state database.")
+            return
+        failed, paper_hashes = state.failed_urls()
+        for output_dir, urls in failed.items():
+            print(f"Retrying {len(urls)} failed URLs in {output_dir}")
+        process_volumes(list(failed.items()), session, args, state, cache, grobid, rates, metrics, paper_hashes)
+        return
+    if args.manifest:
+        volumes, paper_hashes = read_manifest(args.manifest)
+        print(f"Processing {len(volumes)} volumes")
+        process_volumes([(os.path.join('output', volume), urls) for volume, urls in volumes.items()],
+                        session, args, state, cache, grobid, rates, metrics, paper_hashes)
+        return
     dataset_dir = 'dataset'
     if not os.path.exists(dataset_dir):
         print(f"Error: '{dataset_dir}' directory not found.")
         return
+    volumes = []
     for file in os.listdir(dataset_dir):
         if file.endswith('.txt'):
-            file_path = os.path.join(dataset_dir, file)
             print(f"Processing file: {file}")
-            process_url_file(file_path)
+            volumes.append(read_url_file(os.path.join(dataset_dir, file)))
+    process_volumes(volumes, session, args, state, cache, grobid, rates, metrics)
+
+def main():
+    args = parse_args()
+    if args.shards_only and not args.shard_dir:
+        print("Error: --shards-only needs --shard-dir.")
+        return
+    session = make_session(args.concurrency)
+    state = None if args.no_state else CrawlState(args.state_db)
+    cache = None
+    if args.pdf_cache:
+        cache = PdfCache(args.pdf_cache, int(args.pdf_cache_size_gb * 1024 ** 3), revalidate=not args.cache_only)
+    rates = RateController(args.concurrency, args.max_retries, args.backoff_base)
+    metrics = CrawlMetrics(args.metrics) if args.metrics else None
+    grobid = None
+    if args.grobid_url:
+        timeout = args.parse_timeout
+        if args.parse_budget:
+            timeout = min(timeout, args.parse_budget)
+        grobid = GrobidPool(args.grobid_url, parse_pdf, args.workers_per_grobid, timeout, args.tei_fast_path)
+        args.parse_workers = len(grobid.workers)
+    try:
+        run(args, session, state, cache, grobid, rates, metrics)
+    finally:
+        if metrics is not None:
+            metrics.close()
+        if grobid is not None:
+            grobid.close()
+            grobid.report()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
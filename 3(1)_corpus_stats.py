@@ -0,0 +1,148 @@
+import os
+import json
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from shard_store import iter_volume, list_volumes, shard_paths
+from file_state import load_state, same_stat
+
+# One parallel pass over 1(a)_output (or the JSONL shards) computing what
+# 3_ethics_counter.py, 4(1)_outer_section_list.py and 4(2)_inner_section_list.py
+# compute separately. Per-file results are kept in the report together with
+# the file's size and mtime, so a refresh only decodes new or changed files.
+
+def headings_of(data):
+    if isinstance(data, dict):
+        sections = data.get('sections', [])
+        if not isinstance(sections, list):
+            return []
+    elif isinstance(data, list):
+        sections = data
+    else:
+        return []
+    return [section['heading'] for section in sections if isinstance(section, dict) and 'heading' in section]
+
+def article_keys(data):
+    keys = Counter(data.keys())
+    for section in data.get('sections', []):
+        keys.update(section.keys())
+    return keys
+
+def file_stats(path):
+    # Same rules as the three scripts this replaces: a paper is counted from
+    # its file name, as 3_ethics_counter.py does, even if it cannot be decoded
+    name = os.path.basename(path)
+    stats = {'papers': 0, 'ethics': 0, 'keys': Counter(), 'headings': Counter(), 'errors': 0}
+    if not name.endswith('_ethics.json'):
+        stats['papers'] = 1
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        stats['errors'] = 1
+        return stats
+    if name.endswith('_ethics.json') and data:
+        stats['ethics'] = 1
+    if 'ethics' not in name.lower() and isinstance(data, dict):
+        stats['keys'] = article_keys(data)
+    stats['headings'] = Counter(headings_of(data))
+    return stats
+
+def volume_stats(shard_dir, volume):
+    stats = {'papers': 0, 'ethics': 0, 'keys': Counter(), 'headings': Counter(), 'errors': 0}
+    for record in iter_volume(shard_dir, volume):
+        stats['papers'] += 1
+        if record['ethics']:
+            stats['ethics'] += 1
+        stats['keys'].update(article_keys(record['article']))
+        stats['headings'].update(headings_of(record['article']))
+        stats['headings'].update(headings_of(record['ethics']))
+    return stats
+
+def stats_task(task):
+    kind, key, path = task
+    if kind == 'volume':
+        return key, volume_stats(path, key)
+    return key, file_stats(path)
+
+def list_units(input_dir, shard_dir):
+    # (kind, report key, path, fingerprint path) for every file or shard volume
+    if shard_dir:
+        return [('volume', volume, shard_dir, shard_paths(shard_dir, volume)[0]) for volume in list_volumes(shard_dir)]
+    units = []
+    for root, _, files in os.walk(input_dir):
+        for file in files:
+            if file.endswith('.json'):
+                path = os.path.join(root, file)
+                units.append(('file', os.path.relpath(path, input_dir), path, path))
+    return units
+
+def build_report(input_dir, shard_dir, report_path, workers=None):
+    previous = load_state(report_path)
+    source = shard_dir or input_dir
+    cached = previous.get('units', {}) if previous.get('source') == source else {}
+    units = {}
+    tasks = []
+    for kind, key, path, fingerprint_path in list_units(input_dir, shard_dir):
+        stat = os.stat(fingerprint_path)
+        entry = cached.get(key)
+        if same_stat(entry, stat):
+            units[key] = entry
+        else:
+            units[key] = {'size': stat.st_size, 'mtime': stat.st_mtime}
+            tasks.append((kind, key, path))
+    print(f"{len(tasks)} of {len(units)} inputs are new or changed")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for key, stats in executor.map(stats_task, tasks, chunksize=64):
+            units[key]['stats'] = stats
+
+    totals = {'papers': 0, 'ethics': 0, 'errors': 0}
+    keys = Counter()
+    headings = Counter()
+    for entry in units.values():
+        stats = entry['stats']
+        for name in totals:
+            totals[name] += stats[name]
+        keys.update(stats['keys'])
+        headings.update(stats['headings'])
+    report = {
+        'source': source,
+        'total_papers': totals['papers'],
+        'total_ethics_sections': totals['ethics'],
+        'unreadable_files': totals['errors'],
+        'keys': dict(keys.most_common()),
+        'headings': dict(sorted(headings.items(), key=lambda x: x[1], reverse=True)),
+        'units': units,
+    }
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Paper, ethics, key and heading counts in one parallel pass')
+    parser.add_argument('--input', default='1(a)_output', help='Directory of parsed article JSON')
+    parser.add_argument('--shards', help='Read JSONL shards from 2_pdf_parser.py --shard-dir instead of --input')
+    parser.add_argument('--report', default='3_corpus_stats.json', help='Report file; reused to skip unchanged inputs')
+    parser.add_argument('--headings-out', default='4_section_heading.txt', help='Also write heading counts in the 4(2)_inner_section_list.py format')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes')
+    args = parser.parse_args()
+
+    if not args.shards and not os.path.exists(args.input):
+        print(f"Error: The directory '{args.input}' does not exist.")
+        return
+    report = build_report(args.input, args.shards, args.report, args.workers)
+    print(f"Total research papers extracted: {report['total_papers']}")
+    print(f"Total ethics sections extracted: {report['total_ethics_sections']}")
+    print(f"Distinct keys: {len(report['keys'])}, distinct headings: {len(report['headings'])}")
+    if report['unreadable_files']:
+        print(f"Unreadable files (counted above, no keys or headings): {report['unreadable_files']}")
+    if args.headings_out:
+        with open(args.headings_out, 'w', encoding='utf-8') as f:
+            json.dump(report['headings'], f, indent=4, ensure_ascii=False)
+        print(f"Saved heading counts to {args.headings_out}")
+    print(f"Report saved to {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import os
 import json
+import argparse
+from shard_store import iter_records
 
 def count_papers_and_ethics():
     output_dir = '1(a)_output'
@@ -18,8 +20,23 @@ def count_papers_and_ethics():
 
     return total_papers, total_ethics_sections
 
+def count_papers_and_ethics_from_shards(shard_dir):
+    total_papers = 0
+    total_ethics_sections = 0
+    for record in iter_records(shard_dir):
+        total_papers += 1
+        if record['ethics']:
+            total_ethics_sections += 1
+    return total_papers, total_ethics_sections
+
 def main():
-    papers, ethics = count_papers_and_ethics()
+    parser = argparse.ArgumentParser(description='Count extracted papers and ethics sections')
+    parser.add_argument('--shards', help='Read the JSONL shards written by 2_pdf_parser.py --shard-dir instead of 1(a)_output')
+    args = parser.parse_args()
+    if args.shards:
+        papers, ethics = count_papers_and_ethics_from_shards(args.shards)
+    else:
+        papers, ethics = count_papers_and_ethics()
     print(f"Total research papers extracted: {papers}")
     print(f"Total ethics sections extracted: {ethics}")
 
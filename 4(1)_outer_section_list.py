@@ -1,6 +1,8 @@
 import os
+import argparse
 import json
 from collections import Counter
+from shard_store import iter_records
 def extract_keys(json_data, keys_counter):
     keys_counter.update(json_data.keys())    
     if 'sections' in json_data:
@@ -34,13 +36,28 @@ def list_json_keys(input_dir):
     print(f"\nTotal files found: {file_count}")
     print(f"JSON files processed: {json_count}")
     return keys_counter
+def list_shard_keys(shard_dir):
+    keys_counter = Counter()
+    json_count = 0
+    for record in iter_records(shard_dir):
+        json_count += 1
+        extract_keys(record['article'], keys_counter)
+    print(f"\nArticles processed: {json_count}")
+    return keys_counter
 if __name__ == "__main__":
     input_directory = "1(a)_output"  # This is the directory containing your JSON files
+    parser = argparse.ArgumentParser(description='List the keys used in the parsed article JSON')
+    parser.add_argument('--shards', help='Read the JSONL shards written by 2_pdf_parser.py --shard-dir instead')
+    args = parser.parse_args()
     
-    if not os.path.exists(input_directory):
+    if args.shards:
+        keys_counter = list_shard_keys(args.shards)
+    elif not os.path.exists(input_directory):
         print(f"Error: The directory '{input_directory}' does not exist.")
+        keys_counter = None
     else:
         keys_counter = list_json_keys(input_directory)
+    if keys_counter is not None:
         print("\nList of all keys found in JSON files:")
         for key, count in keys_counter.most_common():
             print(f"{key}: {count}")
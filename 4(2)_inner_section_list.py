@@ -1,6 +1,8 @@
 import os
 import json
+import argparse
 from collections import Counter
+from shard_store import iter_records
 
 def extract_headings_from_json(json_path):
     """Extract headings from a JSON file, supporting both dict and list root structures."""
@@ -37,9 +39,24 @@ def collect_headings(directory):
     sorted_headings = dict(sorted(heading_counter.items(), key=lambda x: x[1], reverse=True))
     return sorted_headings
 
+def collect_headings_from_shards(shard_dir):
+    """Collect headings from the JSONL shards, counting ethics sections again as their _ethics.json files would be."""
+    heading_counter = Counter()
+    for record in iter_records(shard_dir):
+        for sections in (record['article'].get('sections', []), record['ethics']):
+            heading_counter.update(section['heading'] for section in sections if isinstance(section, dict) and 'heading' in section)
+    return dict(sorted(heading_counter.items(), key=lambda x: x[1], reverse=True))
+
+parser = argparse.ArgumentParser(description='Count section headings across the parsed articles')
+parser.add_argument('--shards', help='Read the JSONL shards written by 2_pdf_parser.py --shard-dir instead')
+args = parser.parse_args()
+
 # Replace this with your actual directory path
 your_directory = '1(a)_output'
-heading_counts = collect_headings(your_directory)
+if args.shards:
+    heading_counts = collect_headings_from_shards(args.shards)
+else:
+    heading_counts = collect_headings(your_directory)
 
 # Save to a file named '4_section_heading.txt'
 output_path = '4_section_heading.txt'
@@ -1,3 +1,25 @@
+import os
+import csv
+import json
+import sys
+import argparse
+from section_rules import EXCLUDE_HEADINGS, HeadingMatcher, normalize_heading, wrongly_excluded
+
+# Interactive two-pass triage over section_dict. Its answers are saved as seed
+# decisions; --batch then labels every heading in 4_section_heading.txt from
+# those seeds by embedding similarity, and --review asks only about the
+# headings the batch labelling was unsure of. Without a seeds file, --batch
+# starts from section_dict and EXCLUDE_HEADINGS.
+
+HEADINGS_FILE = '4_section_heading.txt'
+SEEDS_FILE = '4_section_seeds.json'
+DECISIONS_FILE = '4_section_decisions.csv'
+REVIEW_FILE = '4_section_review.csv'
+DECISION_FIELDS = ['heading', 'count', 'include', 'confidence', 'status', 'neighbour']
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+MIN_SIMILARITY = 0.75
+MIN_MARGIN = 0.05
+
 # Hardcoded dictionary (shortened for demo)
 section_dict = {
     "Introduction": 11376,
@@ -353,10 +375,10 @@ section_dict = {
     "Detailed Analysis": 30
 }
 
-def get_inclusion_decisions(prompt_num):
+def get_inclusion_decisions(prompt_num, sections=section_dict):
     print(f"\n=== Pass {prompt_num}: Decide whether to include each section ===")
     decisions = {}
-    for section in section_dict:
+    for section in sections:
         while True:
             ans = input(f"Include section '{section}'? (y/n): ").strip().lower()
             if ans in ['y', 'n']:
@@ -386,9 +408,166 @@ def resolve_final_decisions(first_pass, inconsistent_keys):
                 print("Invalid input. Please enter 'y' or 'n'.")
     return first_pass
 
+def load_seeds(seeds_path):
+    if not os.path.exists(seeds_path):
+        return {}
+    with open(seeds_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_seeds(seeds_path, decisions):
+    # A new seeds file starts from the decisions --batch would bootstrap from,
+    # so the first --review does not replace them with its few answers
+    seeds = load_seeds(seeds_path) if os.path.exists(seeds_path) else bootstrap_seeds()
+    seeds.update(decisions)
+    with open(seeds_path, 'w', encoding='utf-8') as f:
+        json.dump(seeds, f, indent=4, ensure_ascii=False)
+    print(f"Saved {len(decisions)} decisions to {seeds_path} ({len(seeds)} seeds in total)")
+
+def bootstrap_seeds():
+    # Seeds from the triage behind EXCLUDE_HEADINGS: section_dict headings it
+    # excluded are removed, every other section_dict heading is kept
+    seeds = {section: section not in EXCLUDE_HEADINGS for section in section_dict}
+    seeds.update((heading, False) for heading in EXCLUDE_HEADINGS)
+    return seeds
+
+def seed_conflicts(seeds):
+    # Seeds that share a canonical form but not a decision; label_headings
+    # keys seeds by canonical form, so these have to be settled first
+    groups = {}
+    for heading, include in seeds.items():
+        groups.setdefault(normalize_heading(heading), {})[heading] = bool(include)
+    return {canonical: group for canonical, group in sorted(groups.items())
+            if len(set(group.values())) > 1}
+
+def label_headings(heading_counts, seeds, model_name=EMBEDDING_MODEL, min_similarity=MIN_SIMILARITY,
+                   min_margin=MIN_MARGIN, batch_size=256):
+    # Every distinct canonical heading is embedded once, in one batched encode,
+    # and takes the decision of its most similar seed. Headings whose best
+    # seed is not similar enough, or whose nearest include and exclude seeds
+    # are too close to call, are left for human review.
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+
+    seed_labels = {}
+    seed_names = {}
+    for heading, include in seeds.items():
+        canonical = normalize_heading(heading)
+        seed_labels[canonical] = bool(include)
+        seed_names.setdefault(canonical, heading)
+    canonical_of = {heading: normalize_heading(heading) for heading in heading_counts}
+    unique = sorted(set(canonical_of.values()) | set(seed_labels))
+    position = {canonical: i for i, canonical in enumerate(unique)}
+
+    print(f"Embedding {len(unique)} distinct headings with {model_name}...")
+    model = SentenceTransformer(model_name)
+    embeddings = model.encode(unique, batch_size=batch_size, normalize_embeddings=True,
+                              convert_to_numpy=True, show_progress_bar=True)
+
+    seed_keys = list(seed_labels)
+    labels = np.array([seed_labels[k] for k in seed_keys])
+    similarities = embeddings @ embeddings[[position[k] for k in seed_keys]].T
+
+    def nearest(mask):
+        if not mask.any():
+            return np.full(len(unique), -1.0), np.zeros(len(unique), dtype=int)
+        masked = np.where(mask, similarities, -np.inf)
+        best = masked.argmax(axis=1)
+        return masked[np.arange(len(unique)), best], best
+
+    include_sim, include_seed = nearest(labels)
+    exclude_sim, exclude_seed = nearest(~labels)
+
+    rows = []
+    for heading, count in heading_counts.items():
+        canonical = canonical_of[heading]
+        if canonical in seed_labels:
+            rows.append({'heading': heading, 'count': count, 'include': int(seed_labels[canonical]),
+                         'confidence': 1.0, 'status': 'seed', 'neighbour': seed_names[canonical]})
+            continue
+        i = position[canonical]
+        include = include_sim[i] >= exclude_sim[i]
+        confidence = max(include_sim[i], exclude_sim[i])
+        neighbour = seed_keys[include_seed[i] if include else exclude_seed[i]]
+        confident = confidence >= min_similarity and abs(include_sim[i] - exclude_sim[i]) >= min_margin
+        rows.append({'heading': heading, 'count': count, 'include': int(include),
+                     'confidence': round(float(confidence), 3),
+                     'status': 'neighbour' if confident else 'review',
+                     'neighbour': seed_names[neighbour]})
+    return rows
+
+def write_decisions(rows, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=DECISION_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def load_review_queue(review_path):
+    with open(review_path, 'r', newline='', encoding='utf-8') as f:
+        return [row['heading'] for row in csv.DictReader(f)]
+
+def run_batch(args):
+    seeds = load_seeds(args.seeds)
+    if not seeds:
+        seeds = bootstrap_seeds()
+        print(f"No seed decisions in '{args.seeds}'; starting from the {len(seeds)} section_dict and EXCLUDE_HEADINGS decisions")
+        save_seeds(args.seeds, seeds)
+    conflicts = seed_conflicts(seeds)
+    if conflicts:
+        for canonical, group in conflicts.items():
+            labels = ', '.join(f"'{heading}' ({'keep' if include else 'remove'})" for heading, include in sorted(group.items()))
+            print(f"❌ Seeds for '{canonical}' disagree: {labels}")
+        print(f"Error: {len(conflicts)} conflicting seeds in '{args.seeds}'. Keep one decision per heading and run --batch again.")
+        return
+    with open(args.headings, 'r', encoding='utf-8') as f:
+        heading_counts = json.load(f)
+    rows = label_headings(heading_counts, seeds, args.model, args.min_similarity, args.min_margin)
+    write_decisions(rows, args.decisions)
+    review = sorted((row for row in rows if row['status'] == 'review'), key=lambda row: row['count'], reverse=True)
+    write_decisions(review, args.review_queue)
+    excluded = sum(1 for row in rows if not row['include'] and row['status'] != 'review')
+    print(f"Labelled {len(rows)} headings: {excluded} excluded, {len(review)} queued for review")
+    print(f"Decision table saved to {args.decisions}, review queue to {args.review_queue}")
+
+def report_wrongly_excluded(kept_headings, excluded_headings):
+    wrong = wrongly_excluded(kept_headings, HeadingMatcher(excluded_headings))
+    for heading in wrong:
+        print(f"❌ '{heading}' was kept but normalizes onto an excluded heading")
+    return not wrong
+
+def check_rules():
+    # Every section_dict heading the triage kept (i.e. not in EXCLUDE_HEADINGS)
+    # must still be kept once headings are compared in canonical form
+    kept = [section for section in section_dict if section not in EXCLUDE_HEADINGS]
+    if report_wrongly_excluded(kept, EXCLUDE_HEADINGS):
+        print(f"✅ All {len(kept)} kept headings are still kept by the exclusion matcher.")
+        return True
+    return False
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Decide which section headings to drop from the articles')
+    parser.add_argument('--check', action='store_true', help='Verify that EXCLUDE_HEADINGS does not drop any heading the triage kept')
+    parser.add_argument('--batch', action='store_true', help='Label every heading in --headings from the seed decisions instead of asking')
+    parser.add_argument('--review', action='store_true', help='Ask only about the headings in --review-queue and add the answers to the seeds')
+    parser.add_argument('--headings', default=HEADINGS_FILE, help='Heading counts written by 4(2)_inner_section_list.py')
+    parser.add_argument('--seeds', default=SEEDS_FILE, help='Labelled headings (JSON heading -> include)')
+    parser.add_argument('--decisions', default=DECISIONS_FILE, help='Decision table read by 4(4)_actually_remove.py --decisions')
+    parser.add_argument('--review-queue', default=REVIEW_FILE, help='Low-confidence headings written by --batch')
+    parser.add_argument('--model', default=EMBEDDING_MODEL, help='Sentence embedding model')
+    parser.add_argument('--min-similarity', type=float, default=MIN_SIMILARITY, help='Below this similarity to the nearest seed a heading goes to review')
+    parser.add_argument('--min-margin', type=float, default=MIN_MARGIN, help='Minimum gap between the nearest include and exclude seeds')
+    return parser.parse_args()
+
 def main():
-    first_pass = get_inclusion_decisions(1)
-    second_pass = get_inclusion_decisions(2)
+    args = parse_args()
+    if args.check:
+        sys.exit(0 if check_rules() else 1)
+    if args.batch:
+        run_batch(args)
+        return
+
+    sections = load_review_queue(args.review_queue) if args.review else section_dict
+    first_pass = get_inclusion_decisions(1, sections)
+    second_pass = get_inclusion_decisions(2, sections)
 
     print("\n=== Consistency Check ===")
     inconsistent_sections = check_consistency(first_pass, second_pass)
@@ -402,6 +581,8 @@ def main():
     excluded_sections = [section for section, include in first_pass.items() if not include]
     print("\n=== Final Excluded Sections ===")
     print(", ".join(excluded_sections))
+    report_wrongly_excluded([section for section, include in first_pass.items() if include], excluded_sections)
+    save_seeds(args.seeds, first_pass)
 
 if __name__ == "__main__":
     main()
@@ -1,43 +1,126 @@
 import os
 import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from shard_store import ShardWriter, iter_volume, list_volumes, shard_paths
+from section_rules import EXCLUDE_HEADINGS, HeadingMatcher, load_decisions
+from file_state import fingerprint, load_state, save_state
 
 # Set source and destination folders
 input_dir = '1(a)_output'
 output_dir = '1(b)_output'
 
-# Define the list of section headings to exclude
-exclude_headings = {
-'Introduction', 'Conclusion', 'Related Work', 'Acknowledgements', 'Limitations', 'Acknowledgments', 'Baselines', 'Conclusions', 'A Appendix', 'Acknowledgement', 'Background', 'Conclusion and Future Work', 'Related work', 'Related Works', 'Preliminaries', 'Overview', 'Appendix', 'Conclusions and Future Work', 'Bibliographical References', 'Acknowledgment', 'Baseline Models', 'Preliminary', 'Annotation', 'ACL 2023 Responsible NLP Checklist', 'Limitation', 'Background and Related Work', 'Baseline Methods', 'Baseline', 'A Appendices', 'Annotation Process', 'Future Work', 'B1. Did you cite the creators of artifacts you used?', 'Data Annotation', 'Summary', 'Reference', 'B Did you use or create scientific artifacts?', 'Appendices', 'Conclusion & Future Work', 'Limitations and Future Work', 'A. Appendix', 'Annotation Guidelines', 'Quantitative Results', 'B Additional Results', 'C Additional Results', 'Qualitative Results', 'Inter-Annotator Agreement', 'References', 'Related works', 'Result', 'Annotation Procedure', 'Annotation Scheme', 'Summarization', 'Conclusion and future work', 'Previous Work', 'A4. Have you used AI writing assistants when working on this paper?', 'Human Annotation', 'A2. Did you discuss any potential risks of your work?', 'A1. Did you describe the limitations of your work?', 'As shown in', 'Baseline Systems', 'Notations', 'Notation', 'Baseline models'
-}
-
-# Traverse through all files in the directory tree
-for root, dirs, files in os.walk(input_dir):
-    for filename in files:
-        if filename.endswith(".json"):
-            input_path = os.path.join(root, filename)
-            
-            # Determine output path by mirroring structure in output_dir
-            relative_path = os.path.relpath(input_path, input_dir)
-            output_path = os.path.join(output_dir, relative_path)
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-            # Read original JSON file
-            with open(input_path, 'r', encoding='utf-8') as f:
-                try:
-                    data = json.load(f)
-                except json.JSONDecodeError:
-                    print(f"Skipping invalid JSON: {input_path}")
+# Per-file input hashes and the rule version of the last run, kept next to
+# the output directory (not in it, where later stages would read it as a
+# paper) so unchanged files are not decoded or rewritten again
+STATE_SUFFIX = '.state.json'
+
+exclude_matcher = HeadingMatcher(EXCLUDE_HEADINGS)
+
+def filter_sections(data):
+    # Filter out sections with headings in the exclusion list
+    if isinstance(data, dict) and "sections" in data:
+        data["sections"] = [
+            section for section in data["sections"]
+            if section.get("heading") not in exclude_matcher
+        ]
+    return data
+
+def process_shards(shard_dir, shards_out):
+    for volume in list_volumes(shard_dir):
+        for path in shard_paths(shards_out, volume):
+            if os.path.exists(path):
+                os.remove(path)
+        writer = ShardWriter(shards_out, volume)
+        for record in iter_volume(shard_dir, volume):
+            writer.write(record['id'], filter_sections(record['article']), record['ethics'])
+        writer.close()
+    print(f" All shards processed into {shards_out}.")
+
+def set_matcher(matcher):
+    global exclude_matcher
+    exclude_matcher = matcher
+
+def process_file(task):
+    input_path, output_path, indent = task
+    # Read original JSON file
+    with open(input_path, 'r', encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError:
+            print(f"Skipping invalid JSON: {input_path}")
+            return False
+
+    data = filter_sections(data)
+
+    # Write the modified JSON to new location
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        if indent is None:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        else:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+    return True
+
+def process_directory(workers=None, indent=None, force=False):
+    state_path = output_dir.rstrip(os.sep) + STATE_SUFFIX
+    previous = load_state(state_path)
+    rules = exclude_matcher.version
+    same_rules = previous.get('rules') == rules and previous.get('indent') == indent and not force
+    previous_files = previous.get('files', {})
+
+    # Traverse through all files in the directory tree
+    files_state = {}
+    tasks = []
+    for root, dirs, files in os.walk(input_dir):
+        for filename in files:
+            if filename.endswith(".json"):
+                input_path = os.path.join(root, filename)
+
+                # Determine output path by mirroring structure in output_dir
+                relative_path = os.path.relpath(input_path, input_dir)
+                output_path = os.path.join(output_dir, relative_path)
+                old = previous_files.get(relative_path)
+                new = fingerprint(input_path, old)
+                files_state[relative_path] = new
+                if same_rules and old and old['sha256'] == new['sha256'] and os.path.exists(output_path):
                     continue
+                tasks.append((input_path, output_path, indent))
+
+    # Outputs whose input is gone
+    for relative_path in previous_files.keys() - files_state.keys():
+        output_path = os.path.join(output_dir, relative_path)
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+    print(f"{len(tasks)} of {len(files_state)} files changed since the last run (rules {rules})")
+    with ProcessPoolExecutor(max_workers=workers, initializer=set_matcher, initargs=(exclude_matcher,)) as executor:
+        for (input_path, _, _), ok in zip(tasks, executor.map(process_file, tasks, chunksize=32)):
+            if not ok:
+                del files_state[os.path.relpath(input_path, input_dir)]
+
+    os.makedirs(output_dir, exist_ok=True)
+    save_state(state_path, {'rules': rules, 'indent': indent, 'files': files_state})
+    print(f" All eligible JSON files processed into {output_dir}.")
+
+def main():
+    global exclude_matcher
+    parser = argparse.ArgumentParser(description='Drop boilerplate sections from the parsed articles')
+    parser.add_argument('--shards', help='Read JSONL shards from 2_pdf_parser.py --shard-dir instead of 1(a)_output')
+    parser.add_argument('--decisions', help='Also drop the headings excluded in this 4(3)_section_to_remove.py --batch decision table')
+    parser.add_argument('--shards-out', default='1(b)_shards', help='Where to write the filtered shards when --shards is given')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes')
+    parser.add_argument('--indent', type=int, default=None, help='Pretty-print the output JSON (compact by default)')
+    parser.add_argument('--force', action='store_true', help='Rewrite every file even if its input and the rules are unchanged')
+    args = parser.parse_args()
 
-            # Filter out sections with headings in the exclusion list
-            if isinstance(data, dict) and "sections" in data:
-                data["sections"] = [
-                    section for section in data["sections"]
-                    if section.get("heading") not in exclude_headings
-                ]
+    if args.decisions:
+        exclude_matcher = HeadingMatcher(EXCLUDE_HEADINGS | load_decisions(args.decisions))
 
-            # Write the modified JSON to new location
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+    if args.shards:
+        process_shards(args.shards, args.shards_out)
+    else:
+        process_directory(args.workers, args.indent, args.force)
 
-print(" All eligible JSON files processed into 1_5_output.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+from section_rules import EXCLUDE_HEADINGS, HeadingMatcher, load_decisions
+from text_render import MODES, process_json_files, process_shards
+
+# One pass over the parsed articles producing any of the 5_json_to_txt*.py
+# corpora, e.g. the fine-tuning text with and without ethics sections:
+#   python 5_render_text.py --fused --mode better=2_output --mode woethics=2_output_woethics
+
+def parse_outputs(specs):
+    # "mode" or "mode=output_dir"; a lone mode writes 2_output as before,
+    # several modes default to 2_output_<mode>
+    outputs = {}
+    for spec in specs or ['better']:
+        mode, _, output_dir = spec.partition('=')
+        if mode not in MODES:
+            raise SystemExit(f"Unknown mode '{mode}', expected one of: {', '.join(MODES)}")
+        outputs[mode] = output_dir
+    for mode, output_dir in outputs.items():
+        if not output_dir:
+            outputs[mode] = '2_output' if len(outputs) == 1 else f"2_output_{mode}"
+    if len(set(outputs.values())) != len(outputs):
+        raise SystemExit("Each mode needs its own output directory")
+    return outputs
+
+def main():
+    parser = argparse.ArgumentParser(description='Render parsed articles as plain text in one or more output modes')
+    parser.add_argument('--mode', action='append', help=f"Output mode, optionally with its directory (mode=dir); one of {', '.join(MODES)}; repeatable")
+    parser.add_argument('--input', default='1(b)_output', help='JSON tree to render')
+    parser.add_argument('--shards', help='Read JSONL shards instead of the JSON tree')
+    parser.add_argument('--fused', action='store_true', help='Read 1(a)_output (or unfiltered shards) and apply the 4(4)_actually_remove.py exclusions while rendering')
+    parser.add_argument('--decisions', help='With --fused, also drop the headings excluded in this 4(3)_section_to_remove.py --batch decision table')
+    parser.add_argument('--filtered-out', help='With --fused, also write the filtered JSON here (what 4(4) writes to 1(b)_output)')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes')
+    args = parser.parse_args()
+
+    if args.filtered_out and (args.shards or not args.fused):
+        parser.error("--filtered-out needs --fused and the JSON tree (4(4)_actually_remove.py --shards writes filtered shards)")
+    outputs = parse_outputs(args.mode)
+    input_directory = args.input
+    excluded_sections = HeadingMatcher([])
+    if args.fused:
+        if input_directory == '1(b)_output':
+            input_directory = '1(a)_output'
+        rules = set(EXCLUDE_HEADINGS)
+        if args.decisions:
+            rules |= load_decisions(args.decisions)
+        excluded_sections = HeadingMatcher(rules)
+
+    if args.shards:
+        process_shards(args.shards, outputs, excluded_sections, args.workers)
+    else:
+        process_json_files(input_directory, outputs, excluded_sections, args.workers, args.filtered_out if args.fused else None)
+    for mode, output_dir in outputs.items():
+        print(f"{mode}: {output_dir}")
+    print("Extraction complete. Check the output folder for results.")
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,11 @@
-import re
 import os
-
-def is_nonsensical_string(text):
-    # Pattern to match sequences of characters separated by spaces
-    pattern = r'(?<!\S)(?:(?:[^\s])\s){15,}(?:[^\s])(?!\S)'
-    matches = re.finditer(pattern, text)
-    return [match.group() for match in matches if is_valid_match(match.group())]
-
-def is_valid_match(match):
-    parts = match.split()
-    if len(parts) < 15:
-        return False
-    if not all(len(part) == 1 for part in parts):
-        return False
-    unique_chars = set(parts)
-    if len(unique_chars) < 3:
-        return False
-    # Check if it's not a common valid sequence (like a table of contents)
-    if re.match(r'^[0-9.]+$', ''.join(parts)):
-        return False
-    return True
+from garbled_text import find_garbled_strings
 
 def process_file(file_path):
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
-        return is_nonsensical_string(content)
+        return find_garbled_strings(content)
     except Exception as e:
         print(f"Error processing {file_path}: {str(e)}")
         return []
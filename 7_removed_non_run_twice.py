@@ -1,56 +1,87 @@
 
-import re
 import os
+import csv
+import codecs
 import shutil
+import hashlib
+import argparse
 import chardet
+from concurrent.futures import ProcessPoolExecutor
+from garbled_text import DETECTOR_VERSION, find_garbled_spans, remove_spans
+from file_state import load_state, same_stat, save_state
 
-def is_nonsensical_string(text):
-    pattern = r'(?<!\S)(?:(?:[^\s])\s){15,}(?:[^\s])(?!\S)'
-    matches = re.finditer(pattern, text)
-    return [match.group() for match in matches if is_valid_match(match.group())]
-
-def is_valid_match(match):
-    parts = match.split()
-    if len(parts) < 15:
-        return False
-    if not all(len(part) == 1 for part in parts):
-        return False
-    unique_chars = set(parts)
-    if len(unique_chars) < 3:
-        return False
-    if re.match(r'^[0-9.]+$', ''.join(parts)):
-        return False
-    return True
-
-def detect_encoding(file_path):
-    with open(file_path, 'rb') as file:
-        raw_data = file.read()
-    return chardet.detect(raw_data)['encoding']
-
-def process_file(input_file_path, output_file_path):
+# One row per removed run: the file (relative to the input directory) and the
+# run's offsets into the decoded text before removal, with newlines
+# normalized to \n, counted in UTF-8 bytes. They match the raw input file
+# only when it is UTF-8 with \n newlines.
+REPORT_FILE = '3_output_removed.csv'
+REPORT_FIELDS = ['file', 'start_text_byte', 'end_text_byte']
+# Same format as 6_nonsense_collection.py
+COLLECTION_FILE = 'nonsensical_strings.txt'
+
+# Text is decoded as strict UTF-8 first; only files that fail get charset
+# detection, on ENCODING_SAMPLE_BYTES around the first byte that is not UTF-8
+# (an ASCII prefix alone would be detected as 'ascii').
+ENCODING_SAMPLE_BYTES = 64 * 1024
+UTF8_ENCODINGS = ('utf-8', 'utf-8-sig')
+
+# Per-file results of the last run (content hash, encoding, removed spans),
+# kept next to the output directory. A file is cleaned again only when its
+# content or DETECTOR_VERSION changes; unchanged files are reported from here.
+STATE_SUFFIX = '.state.json'
+
+def detect_encoding(raw_data):
+    # Returns (encoding, whether charset detection was needed)
+    if raw_data.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig', False
     try:
-        # Check if output file already exists
-        if os.path.exists(output_file_path):
-            #print(f"Skipping {input_file_path} as output file already exists.")
-            return False
+        raw_data.decode('utf-8')
+        return 'utf-8', False
+    except UnicodeDecodeError as e:
+        start = max(0, e.start - ENCODING_SAMPLE_BYTES // 2)
+        sample = raw_data[start:start + ENCODING_SAMPLE_BYTES]
+        return chardet.detect(sample)['encoding'] or 'utf-8', True
+
+def decode_text(raw_data, encoding):
+    try:
+        content = raw_data.decode(encoding, errors='replace')
+    except LookupError:
+        content = raw_data.decode('utf-8', errors='replace')
+    # Same newlines as reading the file in text mode
+    return content.replace('\r\n', '\n').replace('\r', '\n')
+
+def process_file(task):
+    # Detect, clean and describe one file; returns its state entry
+    input_file_path, output_file_path, previous, same_detector = task
+    try:
+        with open(input_file_path, 'rb') as f:
+            raw_data = f.read()
+        stat = os.stat(input_file_path)
+        sha256 = hashlib.sha256(raw_data).hexdigest()
+        unchanged = previous is not None and previous['sha256'] == sha256
+        if unchanged and same_detector and os.path.exists(output_file_path):
+            return dict(previous, size=stat.st_size, mtime=stat.st_mtime), False
 
         # Detect file encoding
-        encoding = detect_encoding(input_file_path)
-        
-        with open(input_file_path, 'r', encoding=encoding, errors='replace') as f:
-            content = f.read()
-        
-        nonsensical_strings = is_nonsensical_string(content)
-        
-        if nonsensical_strings:
-            for nonsense in nonsensical_strings:
-                content = content.replace(nonsense, '')
-            os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+        if unchanged:
+            encoding, detected = previous['encoding'], previous.get('detected', previous['encoding'] not in UTF8_ENCODINGS)
+        else:
+            encoding, detected = detect_encoding(raw_data)
+        content = decode_text(raw_data, encoding)
+        spans = find_garbled_spans(content)
+        strings = [content[start:end] for start, end in spans]
+        removed = []
+
+        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+        if spans:
+            content, removed = remove_spans(content, spans)
             with open(output_file_path, 'w', encoding='utf-8', errors='replace') as f:
                 f.write(content)  
         else:
             shutil.copy2(input_file_path, output_file_path)
-        return True
+        entry = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha256,
+                 'encoding': encoding, 'detected': detected, 'removed': removed, 'strings': strings}
+        return entry, True
     except PermissionError:
         print(f"Permission denied: Unable to read or write {input_file_path}")
     except FileNotFoundError:
@@ -61,29 +92,102 @@ def process_file(input_file_path, output_file_path):
         print(f"OS error occurred while processing {input_file_path}: {str(e)}")
     except Exception as e:
         print(f"Unexpected error processing {input_file_path}: {str(e)}")
-    return False
+    return None, False
 
-def process_directory(input_directory, output_directory):
-    processed_count = 0
-    skipped_count = 0
+def write_reports(input_directory, entries, report_path, collection_path):
+    with open(report_path, 'w', newline='', encoding='utf-8') as report_file:
+        report = csv.writer(report_file)
+        report.writerow(REPORT_FIELDS)
+        for relative_path in sorted(entries):
+            for start, end in entries[relative_path]['removed']:
+                report.writerow([relative_path, start, end])
+    with open(collection_path, 'w', encoding='utf-8') as cf:
+        for relative_path in sorted(entries):
+            if entries[relative_path]['strings']:
+                cf.write(f"File: {os.path.join(input_directory, relative_path)}\n")
+                for string in entries[relative_path]['strings']:
+                    cf.write(f"Nonsensical string: {string}\n")
+                cf.write("\n")
+
+def process_directory(input_directory, output_directory, report_path=REPORT_FILE, collection_path=COLLECTION_FILE,
+                      workers=None, force=False):
+    state_path = output_directory.rstrip(os.sep) + STATE_SUFFIX
+    state = load_state(state_path)
+    same_detector = state.get('detector') == DETECTOR_VERSION and not force
+    previous_files = state.get('files', {})
+
+    entries = {}
+    tasks = []
+    # Every input found by the walk, including the ones that fail below
+    seen = set()
+    error_count = 0
+    # Entries carried over from the last run for files that failed this time
+    kept_count = 0
     for root, dirs, files in os.walk(input_directory):
         for file in files:
             if file.endswith('.txt'):
                 input_file_path = os.path.join(root, file)
                 relative_path = os.path.relpath(input_file_path, input_directory)
                 output_file_path = os.path.join(output_directory, relative_path)
-                
-                if process_file(input_file_path, output_file_path):
-                    processed_count += 1
-                else:
-                    skipped_count += 1
+                previous = previous_files.get(relative_path)
+                seen.add(relative_path)
+                try:
+                    stat = os.stat(input_file_path)
+                except OSError as e:
+                    print(f"OS error occurred while processing {input_file_path}: {str(e)}")
+                    error_count += 1
+                    if previous:
+                        entries[relative_path] = previous
+                        kept_count += 1
+                    continue
+                if same_detector and same_stat(previous, stat) and os.path.exists(output_file_path):
+                    entries[relative_path] = previous
+                    continue
+                tasks.append((relative_path, (input_file_path, output_file_path, previous, same_detector)))
+
+    processed_count = 0
+    fallback_count = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(process_file, [task for _, task in tasks], chunksize=16)
+        for (relative_path, _), (entry, cleaned) in zip(tasks, results):
+            if entry is None:
+                # Keep the last good result; the file is retried next run
+                error_count += 1
+                if previous_files.get(relative_path):
+                    entries[relative_path] = previous_files[relative_path]
+                    kept_count += 1
+                continue
+            entries[relative_path] = entry
+            processed_count += cleaned
+            fallback_count += cleaned and entry.get('detected', False)
+
+    # Outputs whose input is gone
+    for relative_path in previous_files.keys() - seen:
+        output_file_path = os.path.join(output_directory, relative_path)
+        if os.path.exists(output_file_path):
+            os.remove(output_file_path)
+
+    save_state(state_path, {'detector': DETECTOR_VERSION, 'files': entries})
+    write_reports(input_directory, entries, report_path, collection_path)
+    garbled_count = sum(1 for entry in entries.values() if entry['removed'])
     
     print(f"Processing complete. Output directory: {output_directory}")
     print(f"Files processed: {processed_count}")
-    print(f"Files skipped: {skipped_count}")
+    print(f"Files unchanged since the last run: {len(entries) - processed_count - kept_count}")
+    print(f"Files with errors: {error_count}")
+    print(f"Files with garbled text: {garbled_count}")
+    print(f"Files processed that needed charset detection: {fallback_count}")
+    print(f"Removed spans listed in {report_path}, strings in {collection_path}")
 
 # Main execution
-input_directory = os.path.join(os.getcwd(), '2_output')  # Change this to your input directory path
-output_directory = os.path.join(os.getcwd(), '3_output')  # Change this to your desired output directory path
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Detect, remove and report spaced-out PDF garbage in one pass')
+    parser.add_argument('--input', default=os.path.join(os.getcwd(), '2_output'), help='Directory of rendered .txt files')
+    parser.add_argument('--output', default=os.path.join(os.getcwd(), '3_output'), help='Directory for the cleaned text')
+    parser.add_argument('--report', default=REPORT_FILE, help='CSV of removed byte spans')
+    parser.add_argument('--collection', default=COLLECTION_FILE, help='Detected strings, in the 6_nonsense_collection.py format')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes')
+    parser.add_argument('--force', action='store_true', help='Clean every file even if it and the detector are unchanged')
+    args = parser.parse_args()
 
-process_directory(input_directory, output_directory)
\ No newline at end of file
+    process_directory(args.input, args.output, args.report, args.collection, args.workers, args.force)
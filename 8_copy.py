@@ -1,5 +1,7 @@
 import os
 import shutil
+import argparse
+from shard_store import iter_records
 def process_files(source_dir, target_dir, output_dir):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
@@ -17,7 +19,25 @@ def process_files(source_dir, target_dir, output_dir):
                     output_file_path = os.path.join(output_subdir, new_filename)
                     shutil.copy2(target_file_path, output_file_path)
                     print(f"Copied {target_file_path} to {output_file_path}")
-source_directory = "1(b)_output"
+def process_shards(shard_dir, target_dir, output_dir):
+    for record in iter_records(shard_dir):
+        if record['ethics']:
+            new_filename = f"{record['id']}.txt"
+            target_file_path = os.path.join(target_dir, record['volume'], new_filename)
+            if os.path.exists(target_file_path):
+                output_subdir = os.path.join(output_dir, record['volume'])
+                os.makedirs(output_subdir, exist_ok=True)
+                output_file_path = os.path.join(output_subdir, new_filename)
+                shutil.copy2(target_file_path, output_file_path)
+                print(f"Copied {target_file_path} to {output_file_path}")
+parser = argparse.ArgumentParser(description='Copy the cleaned texts of papers that have an ethics section')
+parser.add_argument('--shards', help='Take the papers with ethics sections from JSONL shards instead of 1(b)_output')
+parser.add_argument('--source', default='1(b)_output', help='JSON tree listing the ethics files (1(a)_output when 1(b)_output was skipped with 5_json_to_txt_better.py --fused)')
+args = parser.parse_args()
+source_directory = args.source
 target_directory = "3_output"
 output_directory = "4_output"
-process_files(source_directory, target_directory, output_directory)
\ No newline at end of file
+if args.shards:
+    process_shards(args.shards, target_directory, output_directory)
+else:
+    process_files(source_directory, target_directory, output_directory)
\ No newline at end of file
@@ -0,0 +1,80 @@
+import re
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+# Text-layer parser used when GROBID fails or is too slow. It reads the PDF's
+# embedded text with pypdf and splits it into sections with a line-based
+# heading heuristic, returning the {title, abstract, sections} shape that
+# scipdf.parse_pdf_to_dict produces for the fields the pipeline reads.
+
+# Section numbers have one or two digits, so wrapped lines starting with a
+# year or a count ("2019 We found ...") are not taken for headings
+NUMBER_PREFIX = r'^(?:\d{1,2}(?:\.\d+)*\.?|[A-H](?:\.\d*)+|[A-H]\d+(?:\.\d+)*\.?)\s+'
+NUMBERED_HEADING = re.compile(NUMBER_PREFIX + r'[A-Z][^.!?]{1,80}$')
+MAX_HEADING_WORDS = 10
+KNOWN_HEADINGS = {
+    'abstract', 'introduction', 'related work', 'background', 'method', 'methods', 'methodology',
+    'experiments', 'experimental setup', 'results', 'discussion', 'analysis', 'conclusion',
+    'conclusions', 'limitations', 'ethics statement', 'ethical considerations', 'ethics',
+    'broader impact', 'acknowledgements', 'acknowledgments', 'references', 'appendix',
+}
+END_HEADINGS = {'references', 'bibliography'}
+
+def heading_of(line):
+    line = line.strip()
+    if not line or len(line) > 90:
+        return None
+    if line.lower().rstrip(':') in KNOWN_HEADINGS:
+        return line.rstrip(':')
+    if NUMBERED_HEADING.match(line) and not line.endswith(',') and len(line.split()) <= MAX_HEADING_WORDS + 1:
+        return line
+    return None
+
+def join_lines(lines):
+    text = ' '.join(line.strip() for line in lines if line.strip())
+    return re.sub(r'(\w)- (\w)', r'\1\2', text)
+
+def parse_text(text, title=None):
+    lines = text.splitlines()
+    if not title:
+        title = next((line.strip() for line in lines if line.strip()), '')
+    abstract = []
+    sections = []
+    current = None
+    for line in lines:
+        heading = heading_of(line)
+        if heading is not None:
+            bare = re.sub(NUMBER_PREFIX, '', heading).lower()
+            if bare in END_HEADINGS:
+                break
+            current = {'heading': heading, 'lines': []}
+            if bare != 'abstract':
+                sections.append(current)
+            else:
+                current['lines'] = abstract
+            continue
+        if current is not None:
+            current['lines'].append(line)
+    return {
+        'title': title,
+        'abstract': join_lines(abstract),
+        'sections': [{'heading': s['heading'], 'text': join_lines(s['lines'])} for s in sections],
+        'parser': 'text-layer',
+    }
+
+def parse_pdf_text_layer(pdf_file):
+    if PdfReader is None:
+        return None, "pypdf is not installed"
+    try:
+        reader = PdfReader(pdf_file)
+        text = '\n'.join(page.extract_text() or '' for page in reader.pages)
+        title = reader.metadata.title if reader.metadata else None
+        article = parse_text(text, title)
+    except Exception as e:
+        return None, str(e)
+    if not article['sections']:
+        return None, "no sections found in the PDF text layer"
+    return article, None
@@ -0,0 +1,37 @@
+import os
+import json
+import hashlib
+
+# Change detection shared by the incremental stages (1_links.py,
+# 3(1)_corpus_stats.py, 4(4)_actually_remove.py, 7_removed_non_run_twice.py).
+# Each stage keeps a JSON state file with a fingerprint per input: size,
+# mtime and, where content matters, sha256. Size and mtime are checked
+# first, so unchanged inputs are never re-read.
+
+def file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def same_stat(previous, stat):
+    # previous is a fingerprint (or any state entry with size and mtime)
+    return bool(previous) and previous.get('size') == stat.st_size and previous.get('mtime') == stat.st_mtime
+
+def fingerprint(path, previous=None):
+    # Reuses previous, hash included, when size and mtime still match
+    stat = os.stat(path)
+    if same_stat(previous, stat):
+        return previous
+    return {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': file_hash(path)}
+
+def load_state(state_path):
+    if os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def save_state(state_path, state, **dump_args):
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, **dump_args)
@@ -0,0 +1,112 @@
+import os
+import re
+import sys
+import time
+
+# Detector for spaced-out PDF garbage ("a b c d ..."), shared by
+# 6_nonsense_collection.py and 7_removed_non_run_twice.py. A garbled run is a
+# maximal sequence of at least MIN_RUN single-character tokens, each separated
+# by exactly one whitespace character, with at least MIN_UNIQUE distinct
+# characters and not made only of digits and dots (tables of contents).
+# This is what the old regex plus is_valid_match accepted, checked in the
+# same pass that finds the run instead of re-splitting every match.
+
+# Bump when the detection rules change so cached results are recomputed
+DETECTOR_VERSION = 1
+MIN_RUN = 16
+MIN_UNIQUE = 3
+NUMERIC = frozenset('0123456789.')
+# A single-character token: one non-space character between whitespace (or
+# the ends of the text). Only used to jump to where a run could start.
+TOKEN = re.compile(r'(?<!\S)\S(?!\S)')
+
+def find_garbled_spans(text):
+    # Returns (start, end) offsets of every garbled run in text. Each run is
+    # grown token by token from its first token, and the next search starts
+    # after the run's last token, whether the run qualified or not, so every
+    # character is looked at a constant number of times.
+    spans = []
+    n = len(text)
+    match = TOKEN.search(text)
+    while match:
+        start = last = match.start()
+        count = 1
+        chars = {text[start]}
+        # the next token sits two characters on, after exactly one whitespace
+        # character, and is itself followed by whitespace or the end
+        while (last + 2 < n and not text[last + 2].isspace()
+               and (last + 3 == n or text[last + 3].isspace())):
+            last += 2
+            count += 1
+            chars.add(text[last])
+        if count >= MIN_RUN and len(chars) >= MIN_UNIQUE and not chars <= NUMERIC:
+            spans.append((start, last + 1))
+        match = TOKEN.search(text, last + 1)
+    return spans
+
+def find_garbled_strings(text):
+    return [text[start:end] for start, end in find_garbled_spans(text)]
+
+def remove_spans(text, spans):
+    # Rebuilds text once from the slices between spans. Also returns each
+    # removed span as byte offsets into text encoded as UTF-8 (the decoded
+    # text, not the file it was read from).
+    kept = []
+    removed = []
+    pos = byte_pos = 0
+    for start, end in spans:
+        piece = text[pos:start]
+        kept.append(piece)
+        byte_pos += len(piece.encode('utf-8', errors='replace'))
+        length = len(text[start:end].encode('utf-8', errors='replace'))
+        removed.append((byte_pos, byte_pos + length))
+        byte_pos += length
+        pos = end
+    kept.append(text[pos:])
+    return ''.join(kept), removed
+
+def regex_spans(text):
+    # The detector this module replaced, kept as the parity reference
+    pattern = r'(?<!\S)(?:(?:[^\s])\s){15,}(?:[^\s])(?!\S)'
+    spans = []
+    for match in re.finditer(pattern, text):
+        parts = match.group().split()
+        if len(parts) < 15 or not all(len(part) == 1 for part in parts) or len(set(parts)) < 3:
+            continue
+        if re.match(r'^[0-9.]+$', ''.join(parts)):
+            continue
+        spans.append(match.span())
+    return spans
+
+def benchmark(directory):
+    # python garbled_text.py 2_output
+    regex_seconds = scan_seconds = 0.0
+    files = mismatches = runs = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if not name.endswith('.txt'):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+            start = time.perf_counter()
+            expected = regex_spans(text)
+            regex_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            actual = find_garbled_spans(text)
+            scan_seconds += time.perf_counter() - start
+            files += 1
+            runs += len(expected)
+            if actual != expected:
+                mismatches += 1
+                print(f"{path}: regex found {len(expected)} runs, scanner {len(actual)}")
+    print(f"{files} files, {runs} garbled runs, {mismatches} files with differing spans")
+    if files:
+        print(f"Regex:   {regex_seconds:.2f}s ({regex_seconds / files * 1000:.2f} ms/file)")
+        print(f"Scanner: {scan_seconds:.2f}s ({scan_seconds / files * 1000:.2f} ms/file)")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python garbled_text.py <text_directory>")
+        sys.exit(1)
+    benchmark(sys.argv[1])
@@ -0,0 +1,126 @@
+import time
+import queue
+import multiprocessing
+
+# Watchdog pool of GROBID worker processes for 2_pdf_parser.py --grobid-url.
+# Each worker calls parse(pdf_file, grobid_url, fast_tei) -> (article, error)
+# in a child process; parse must be a module-level function so the spawned
+# child can import it.
+
+PARSE_TIMEOUT = 120
+# GROBID workers are restarted from a process already running download and
+# parse threads; forking it could copy a lock some thread holds, so workers
+# start from a fresh interpreter instead
+WORKER_CONTEXT = multiprocessing.get_context('spawn')
+# A spawned worker re-imports the parser module (and scipdf's pandas/textstat)
+# before it can parse; this long is allowed for that, apart from any PDF's timeout
+WORKER_START_TIMEOUT = 300
+
+def grobid_worker_loop(conn, parse, grobid_url, fast_tei):
+    # The imports are done by now; start() waits for this
+    conn.send('ready')
+    while True:
+        pdf_file = conn.recv()
+        if pdf_file is None:
+            return
+        conn.send(parse(pdf_file, grobid_url, fast_tei))
+
+class GrobidWorker:
+    # A child process that sends PDFs to one GROBID instance. It is killed
+    # and respawned when a PDF exceeds the wall-clock timeout. Killing it only
+    # drops the HTTP request: GROBID keeps working on that PDF until it
+    # finishes or hits its own timeout, so a burst of timeouts can leave the
+    # instance busy for a while.
+    def __init__(self, grobid_url, parse, fast_tei=False):
+        self.grobid_url = grobid_url
+        self.parse_target = parse
+        self.fast_tei = fast_tei
+        self.parsed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.busy_seconds = 0.0
+        self.start()
+
+    def start(self):
+        self.conn, child_conn = WORKER_CONTEXT.Pipe()
+        self.process = WORKER_CONTEXT.Process(target=grobid_worker_loop, args=(child_conn, self.parse_target, self.grobid_url, self.fast_tei), daemon=True)
+        self.process.start()
+        # Only the child holds its end now, so recv() fails if it dies
+        child_conn.close()
+        if not self.conn.poll(WORKER_START_TIMEOUT):
+            self.process.kill()
+            raise RuntimeError(f"GROBID worker for {self.grobid_url} did not start within {WORKER_START_TIMEOUT}s")
+        self.conn.recv()
+
+    def parse(self, pdf_file, timeout):
+        start = time.perf_counter()
+        try:
+            self.conn.send(pdf_file)
+            if self.conn.poll(timeout):
+                article_dict, error = self.conn.recv()
+            else:
+                article_dict, error = None, f"GROBID timeout after {timeout}s on {self.grobid_url}"
+                self.timeouts += 1
+                self.restart()
+        except (EOFError, OSError) as e:
+            article_dict, error = None, f"GROBID worker for {self.grobid_url} died: {e}"
+            self.restart()
+        self.busy_seconds += time.perf_counter() - start
+        if article_dict is not None:
+            self.parsed += 1
+        else:
+            self.failed += 1
+        return article_dict, error
+
+    def restart(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+        self.start()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+
+class GrobidPool:
+    # Hands each PDF to whichever worker is idle, spreading load across the
+    # GROBID instances; one instance gets workers_per_instance workers.
+    def __init__(self, grobid_urls, parse, workers_per_instance=1, timeout=PARSE_TIMEOUT, fast_tei=False):
+        self.timeout = timeout
+        self.workers = [GrobidWorker(url, parse, fast_tei) for url in grobid_urls for _ in range(workers_per_instance)]
+        self.idle = queue.Queue()
+        for worker in self.workers:
+            self.idle.put(worker)
+        self.started = time.perf_counter()
+
+    def parse(self, pdf_file):
+        worker = self.idle.get()
+        try:
+            return worker.parse(pdf_file, self.timeout)
+        finally:
+            self.idle.put(worker)
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        stats = {}
+        for worker in self.workers:
+            entry = stats.setdefault(worker.grobid_url, {'parsed': 0, 'failed': 0, 'timeouts': 0, 'busy_seconds': 0.0})
+            entry['parsed'] += worker.parsed
+            entry['failed'] += worker.failed
+            entry['timeouts'] += worker.timeouts
+            entry['busy_seconds'] += worker.busy_seconds
+        print("GROBID instance throughput:")
+        for grobid_url, entry in stats.items():
+            per_minute = entry['parsed'] / elapsed * 60 if elapsed else 0.0
+            print(f"  {grobid_url}: {entry['parsed']} parsed, {entry['failed']} failed "
+                  f"({entry['timeouts']} timeouts), {per_minute:.1f} papers/min, "
+                  f"{entry['busy_seconds']:.0f}s busy")
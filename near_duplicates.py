@@ -0,0 +1,138 @@
+import os
+import re
+import sys
+import json
+import zlib
+import argparse
+import numpy as np
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+# Near-duplicate papers (workshop and main-venue versions, revisions) in a
+# text tree such as 2_output or 4_output. Each paper gets a MinHash signature
+# over word shingles; LSH banding only compares papers that share a band, and
+# candidate pairs are kept when their estimated Jaccard similarity reaches
+# THRESHOLD. Connected pairs form the clusters written to CLUSTERS_FILE, which
+# 12_parquet.py uses to keep a cluster on one side of the split and
+# 10_ollama.py uses to generate for one member only.
+
+CLUSTERS_FILE = 'duplicate_clusters.json'
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+BANDS = 16  # 8 rows per band: pairs above ~0.7 similarity almost always collide
+THRESHOLD = 0.8
+PRIME = (1 << 31) - 1
+SEED = 42
+WORD = re.compile(r'\w+')
+
+rng = np.random.RandomState(SEED)
+PERM_A = rng.randint(1, PRIME, size=NUM_PERM).astype(np.uint64)
+PERM_B = rng.randint(0, PRIME, size=NUM_PERM).astype(np.uint64)
+
+def shingles(text):
+    # Empty for texts shorter than one shingle
+    words = WORD.findall(text.lower())
+    return {zlib.crc32(' '.join(words[i:i + SHINGLE_WORDS]).encode('utf-8'))
+            for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+def minhash(text):
+    # None when the text has no shingles: empty files would otherwise all
+    # share one signature and end up in one cluster
+    text_shingles = shingles(text)
+    if not text_shingles:
+        return None
+    values = np.fromiter(text_shingles, dtype=np.uint64) % PRIME
+    # (a * x + b) mod p for every permutation and shingle, then the minimum per permutation
+    hashed = (np.outer(values, PERM_A) + PERM_B) % PRIME
+    return hashed.min(axis=0).astype(np.uint32)
+
+def signature_of(path):
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return minhash(f.read())
+
+def candidate_pairs(signatures):
+    rows = NUM_PERM // BANDS
+    pairs = set()
+    for band in range(BANDS):
+        buckets = defaultdict(list)
+        for i, signature in enumerate(signatures):
+            buckets[signature[band * rows:(band + 1) * rows].tobytes()].append(i)
+        for members in buckets.values():
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    pairs.add((members[a], members[b]))
+    return pairs
+
+def find_clusters(names, signatures, threshold=THRESHOLD):
+    parent = list(range(len(names)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in candidate_pairs(signatures):
+        if np.mean(signatures[a] == signatures[b]) >= threshold:
+            parent[root(a)] = root(b)
+    groups = defaultdict(list)
+    for i, name in enumerate(names):
+        groups[root(i)].append(name)
+    # The first member (in sorted order) is the one later stages keep
+    return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+def detect(input_dir, workers=None, threshold=THRESHOLD):
+    names = []
+    for root, _, files in os.walk(input_dir):
+        for file in files:
+            if file.endswith('.txt'):
+                names.append(os.path.relpath(os.path.join(root, file), input_dir))
+    names.sort()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        signatures = list(executor.map(signature_of, [os.path.join(input_dir, n) for n in names], chunksize=32))
+    # Papers shorter than SHINGLE_WORDS words are never clustered
+    kept = [i for i, signature in enumerate(signatures) if signature is not None]
+    if len(kept) < len(names):
+        print(f"Skipping {len(names) - len(kept)} papers with fewer than {SHINGLE_WORDS} words")
+    return names, find_clusters([names[i] for i in kept], [signatures[i] for i in kept], threshold)
+
+def split_rows(groups, split):
+    # groups[i] is the group (cluster) of row i and split divides the group
+    # keys, in order of first appearance, into (train, test); every row
+    # follows its group, so a cluster never straddles the split. Without
+    # clusters every row is its own group and the split is the per-row one.
+    # Returns (train_rows, test_rows).
+    group_rows = {}
+    for i, group in enumerate(groups):
+        group_rows.setdefault(group, []).append(i)
+    train_groups, test_groups = split(list(group_rows))
+    return ([i for group in train_groups for i in group_rows[group]],
+            [i for group in test_groups for i in group_rows[group]])
+
+def load_clusters(clusters_path):
+    # Maps every clustered file (path relative to the scanned directory) to
+    # its cluster's first member
+    with open(clusters_path, 'r', encoding='utf-8') as f:
+        clusters = json.load(f)['clusters']
+    return {member: cluster[0] for cluster in clusters for member in cluster}
+
+def main():
+    parser = argparse.ArgumentParser(description='Find near-duplicate papers with MinHash and LSH')
+    parser.add_argument('input', help='Text directory, e.g. 2_output or 4_output')
+    parser.add_argument('--output', default=CLUSTERS_FILE, help='Where to write the duplicate clusters')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='Minimum estimated Jaccard similarity')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input):
+        print(f"Error: The directory '{args.input}' does not exist.")
+        sys.exit(1)
+    names, clusters = detect(args.input, args.workers, args.threshold)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'source': args.input, 'threshold': args.threshold, 'clusters': clusters}, f, indent=2, ensure_ascii=False)
+    duplicates = sum(len(cluster) - 1 for cluster in clusters)
+    print(f"{len(names)} papers, {len(clusters)} duplicate clusters, {duplicates} redundant copies")
+    print(f"Clusters saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
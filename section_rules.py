@@ -0,0 +1,96 @@
+import re
+import csv
+import hashlib
+from functools import lru_cache
+
+# Heading canonicalization shared by 4(4)_actually_remove.py and the
+# 5_json_to_txt*.py renderers. Case, numbering ("3.1", "A.", "B1."),
+# punctuation and "&" are normalized away, so "4.2 Related work:" matches the
+# rule "Related Work". Plurals are not folded unless a rule asks for it.
+
+# Numbering prefixes: "3", "3.1.", "IV.", and appendix forms "A.", "A.1",
+# "A1", "B1.", "B1.2". A bare capital letter ("A Appendix") is only treated as
+# a prefix when the rest is itself a known heading (see HeadingMatcher), so
+# "A Study of Bias" is left alone.
+NUMBER_PREFIX = re.compile(r'^\s*(?:\d+(?:\.\d+)*\.?|[IVX]+\.|[A-Z](?:\d+(?:\.\d+)*\.?|\.(?:\d+(?:\.\d+)*\.?)?))\s+(?=\S)')
+LETTER_PREFIX = re.compile(r'^\s*[A-Z]\s+(?=\S)')
+# A rule word written as "Work(s)" matches both the singular and the plural;
+# plurals are otherwise distinct headings ("Result" is not "Results")
+OPTIONAL_PLURAL = re.compile(r'(\w+)\(s\)')
+# Bump when normalize_heading changes so stages keyed on the rule version
+# (4(4)_actually_remove.py) redo their work
+NORMALIZER_VERSION = 2
+NON_WORD = re.compile(r'[^\w\s]+')
+# Spelling variants only, never singular/plural pairs
+WORD_VARIANTS = {
+    'acknowledgment': 'acknowledgement',
+    'acknowledgments': 'acknowledgements',
+}
+
+@lru_cache(maxsize=None)
+def normalize_heading(heading):
+    heading = NUMBER_PREFIX.sub('', heading or '')
+    heading = heading.replace('&', ' & ')
+    words = []
+    for word in heading.lower().split():
+        if word == '&':
+            words.append('and')
+            continue
+        word = NON_WORD.sub('', word)
+        if word:
+            words.append(WORD_VARIANTS.get(word, word))
+    return ' '.join(words)
+
+def expand_rule(rule):
+    # "Related Work(s)" -> {"Related Work", "Related Works"}
+    forms = {rule}
+    while any(OPTIONAL_PLURAL.search(form) for form in forms):
+        forms = {f for form in forms
+                 for f in (OPTIONAL_PLURAL.sub(r'\1', form, count=1), OPTIONAL_PLURAL.sub(r'\1s', form, count=1))}
+    return forms
+
+def strip_letter(heading):
+    match = LETTER_PREFIX.match(heading or '')
+    return heading[match.end():] if match else None
+
+# Section headings dropped before fine-tuning (4(4)_actually_remove.py and
+# 5_json_to_txt_better.py --fused). Headings are compared in canonical form,
+# so one spelling per rule is enough.
+EXCLUDE_HEADINGS = {
+'Introduction', 'Conclusion', 'Related Work', 'Acknowledgements', 'Limitations', 'Acknowledgments', 'Baselines', 'Conclusions', 'A Appendix', 'Acknowledgement', 'Background', 'Conclusion and Future Work', 'Related work', 'Related Works', 'Preliminaries', 'Overview', 'Appendix', 'Conclusions and Future Work', 'Bibliographical References', 'Acknowledgment', 'Baseline Models', 'Preliminary', 'Annotation', 'ACL 2023 Responsible NLP Checklist', 'Limitation', 'Background and Related Work', 'Baseline Methods', 'Baseline', 'A Appendices', 'Annotation Process', 'Future Work', 'B1. Did you cite the creators of artifacts you used?', 'Data Annotation', 'Summary', 'Reference', 'B Did you use or create scientific artifacts?', 'Appendices', 'Conclusion & Future Work', 'Limitations and Future Work', 'A. Appendix', 'Annotation Guidelines', 'Quantitative Results', 'B Additional Results', 'C Additional Results', 'Qualitative Results', 'Inter-Annotator Agreement', 'References', 'Related works', 'Result', 'Annotation Procedure', 'Annotation Scheme', 'Summarization', 'Conclusion and future work', 'Previous Work', 'A4. Have you used AI writing assistants when working on this paper?', 'Human Annotation', 'A2. Did you discuss any potential risks of your work?', 'A1. Did you describe the limitations of your work?', 'As shown in', 'Baseline Systems', 'Notations', 'Notation', 'Baseline models'
+}
+
+def load_decisions(decisions_path):
+    # Headings labelled for removal by 4(3)_section_to_remove.py --batch;
+    # rows still waiting for review are kept
+    with open(decisions_path, 'r', newline='', encoding='utf-8') as f:
+        return {row['heading'] for row in csv.DictReader(f) if row['include'] == '0' and row['status'] != 'review'}
+
+class HeadingMatcher:
+    # Built once from a list of rule headings; `heading in matcher` is at most
+    # two (cached) normalizations plus set lookups
+
+    def __init__(self, headings):
+        rules = {form for h in headings for form in expand_rule(h)}
+        self.canonical = frozenset(normalize_heading(h) for h in rules) - {''}
+        # "B Additional Results" also covers "D Additional Results"
+        lettered = {normalize_heading(strip_letter(h)) for h in rules if strip_letter(h)}
+        self.after_letter = frozenset(self.canonical | lettered) - {''}
+
+    def __contains__(self, heading):
+        if normalize_heading(heading) in self.canonical:
+            return True
+        rest = strip_letter(heading)
+        return rest is not None and normalize_heading(rest) in self.after_letter
+
+    def __len__(self):
+        return len(self.canonical)
+
+    @property
+    def version(self):
+        rules = '\n'.join([str(NORMALIZER_VERSION)] + sorted(self.canonical) + ['--'] + sorted(self.after_letter))
+        return hashlib.sha1(rules.encode('utf-8')).hexdigest()[:12]
+
+def wrongly_excluded(kept_headings, matcher):
+    # Headings a human decided to keep that the matcher would still drop
+    return sorted(h for h in kept_headings if h in matcher)
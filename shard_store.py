@@ -0,0 +1,98 @@
+import os
+import gzip
+import json
+
+# Sharded article store: one <volume>.jsonl per volume holding one compact
+# record per paper ({"id", "volume", "article", "ethics"}), and a sibling
+# <volume>.idx with "id<TAB>byte offset" lines. Shards are append-only; if a
+# paper is written twice the index points at the newest record.
+
+# Fields the later stages read. With projection the shards and per-paper
+# JSON keep only these plus section heading/text; the full GROBID dict goes
+# to a cold copy (<name>.full.json.gz, or a shard under cold/) that is only
+# read on demand.
+HOT_FIELDS = ('title', 'authors', 'abstract')
+COLD_DIR = 'cold'
+
+def project_article(article):
+    hot = {key: article[key] for key in HOT_FIELDS if key in article}
+    hot['sections'] = [
+        {'heading': section.get('heading', ''), 'text': section.get('text', '')}
+        for section in article.get('sections', [])
+    ]
+    return hot
+
+def cold_path(json_path):
+    return f"{os.path.splitext(json_path)[0]}.full.json.gz"
+
+def write_cold(json_path, article):
+    with gzip.open(cold_path(json_path), 'wt', encoding='utf-8') as f:
+        json.dump(article, f, ensure_ascii=False, separators=(',', ':'))
+
+def load_full_article(json_path):
+    with gzip.open(cold_path(json_path), 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+def shard_paths(shard_dir, volume):
+    return os.path.join(shard_dir, f"{volume}.jsonl"), os.path.join(shard_dir, f"{volume}.idx")
+
+def list_volumes(shard_dir):
+    return sorted(f[:-len('.jsonl')] for f in os.listdir(shard_dir) if f.endswith('.jsonl'))
+
+class ShardWriter:
+    def __init__(self, shard_dir, volume):
+        os.makedirs(shard_dir, exist_ok=True)
+        data_path, index_path = shard_paths(shard_dir, volume)
+        self.volume = volume
+        self.data = open(data_path, 'ab')
+        self.index = open(index_path, 'a', encoding='utf-8')
+
+    def write(self, paper_id, article, ethics):
+        record = {'id': paper_id, 'volume': self.volume, 'article': article, 'ethics': ethics}
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        offset = self.data.tell()
+        self.data.write(line.encode('utf-8'))
+        self.data.flush()
+        self.index.write(f"{paper_id}\t{offset}\n")
+        self.index.flush()
+
+    def close(self):
+        self.data.close()
+        self.index.close()
+
+def load_index(shard_dir, volume):
+    index = {}
+    _, index_path = shard_paths(shard_dir, volume)
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                paper_id, offset = line.rstrip('\n').split('\t')
+                index[paper_id] = int(offset)
+    return index
+
+def iter_volume(shard_dir, volume):
+    # Sequential scan of one shard, skipping records superseded by a rewrite
+    data_path, _ = shard_paths(shard_dir, volume)
+    live = set(load_index(shard_dir, volume).values())
+    with open(data_path, 'rb') as f:
+        offset = 0
+        for line in f:
+            if not live or offset in live:
+                yield json.loads(line)
+            offset += len(line)
+
+def iter_records(shard_dir):
+    for volume in list_volumes(shard_dir):
+        yield from iter_volume(shard_dir, volume)
+
+def read_record(shard_dir, volume, paper_id, index=None):
+    if index is None:
+        index = load_index(shard_dir, volume)
+    data_path, _ = shard_paths(shard_dir, volume)
+    with open(data_path, 'rb') as f:
+        f.seek(index[paper_id])
+        return json.loads(f.readline())
+
+def read_full_record(shard_dir, volume, paper_id):
+    # Full GROBID record of a projected shard, from <shard_dir>/cold/
+    return read_record(os.path.join(shard_dir, COLD_DIR), volume, paper_id)
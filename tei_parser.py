@@ -0,0 +1,212 @@
+import io
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+# Streaming TEI -> dict converter producing the same dict as
+# scipdf.parse_pdf_to_dict, without running GROBID's XML through
+# BeautifulSoup's lxml HTML parser. Sections are the <div>s that GROBID
+# writes with an explicit xmlns declaration, which is what scipdf selects;
+# each section, reference and figure is cleared once converted.
+
+TEI_NS = 'http://www.tei-c.org/ns/1.0'
+XML_ID = '{http://www.w3.org/XML/1998/namespace}id'
+
+def local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def text_of(elem):
+    return ''.join(elem.itertext())
+
+def find(elem, name, **attrs):
+    for child in elem.iter():
+        if local(child.tag) == name and all(child.get(k) == v for k, v in attrs.items()):
+            return child
+    return None
+
+def person_name(elem):
+    def part(name, **attrs):
+        found = find(elem, name, **attrs)
+        return text_of(found).strip() if found is not None else ''
+    firstname, middlename, lastname = part('forename', type='first'), part('forename', type='middle'), part('surname')
+    if middlename != '':
+        return firstname + ' ' + middlename + ' ' + lastname
+    return firstname + ' ' + lastname
+
+def convert_section(div):
+    # In scipdf the HTML parser drops the <head> tag and keeps its text, so
+    # a leading <head> becomes the heading and every other child a paragraph
+    children = list(div)
+    if children and local(children[0].tag) == 'head':
+        heading = text_of(children[0])
+        paragraphs = children[1:]
+    else:
+        heading = ''
+        paragraphs = children
+    text = '\n'.join(text_of(p) for p in paragraphs)
+    refs = [ref.get('type') for ref in div.iter() if local(ref.tag) == 'ref']
+    return {
+        'heading': heading,
+        'text': text,
+        'n_publication_ref': refs.count('bibr'),
+        'n_figure_ref': refs.count('figure'),
+    }
+
+def convert_reference(bibl):
+    title = find(bibl, 'title', level='a')
+    if title is None:
+        title = find(bibl, 'title', level='m')
+    journal = find(bibl, 'title', level='j')
+    journal = text_of(journal) if journal is not None else ''
+    if journal == '':
+        publisher = find(bibl, 'publisher')
+        journal = text_of(publisher) if publisher is not None else ''
+    date = find(bibl, 'date')
+    authors = [person_name(author) for author in bibl.iter() if local(author.tag) == 'author']
+    return {
+        'title': text_of(title) if title is not None else '',
+        'journal': journal,
+        'year': date.get('when') if date is not None else '',
+        'authors': '; '.join(authors),
+    }
+
+def convert_figure(figure):
+    figure_type = figure.get('type') or ''
+    label = find(figure, 'label')
+    caption, data = text_of(figure), ''
+    if figure_type == 'table':
+        desc = find(figure, 'figDesc')
+        table = find(figure, 'table')
+        caption = text_of(desc) if desc is not None else ''
+        data = text_of(table) if table is not None else ''
+    return {
+        'figure_label': text_of(label) if label is not None else '',
+        'figure_type': figure_type,
+        'figure_id': figure.get(XML_ID) or '',
+        'figure_caption': caption,
+        'figure_data': data,
+    }
+
+def convert_formula(formula):
+    coords = formula.get('coords') or ''
+    if coords == '':
+        return None
+    try:
+        coordinates = [float(x) for x in coords.split(',')]
+    except ValueError:
+        coordinates = [[float(x) for x in box.split(',')] for box in coords.split(';')]
+    return {
+        'formula_id': formula.get(XML_ID) or '',
+        'formula_text': text_of(formula),
+        'formula_coordinates': coordinates,
+    }
+
+def convert_abstract(abstract):
+    parts = []
+    for child in abstract:
+        if len(child) or child.text:
+            parts.append(' '.join(text_of(elem) for elem in child if local(elem.tag) != 'head'))
+    return ''.join(parts)
+
+def tei_to_dict(tei):
+    if isinstance(tei, str):
+        tei = tei.encode('utf-8')
+    article = {'title': None, 'authors': [], 'pub_date': None, 'abstract': '', 'sections': [],
+               'references': [], 'figures': [], 'formulas': [], 'doi': None}
+    path = []
+    declared_ns = False
+    section_divs = set()
+    in_text = 0
+    in_references = 0
+    for event, elem in ET.iterparse(io.BytesIO(tei), events=('start-ns', 'start', 'end')):
+        if event == 'start-ns':
+            declared_ns = declared_ns or elem[1] == TEI_NS
+            continue
+        name = local(elem.tag)
+        if event == 'start':
+            if name == 'div' and declared_ns and in_text:
+                section_divs.add(elem)
+            if name == 'text':
+                in_text += 1
+            elif name == 'div' and elem.get('type') == 'references' and in_text:
+                in_references += 1
+            declared_ns = False
+            path.append(name)
+            continue
+
+        path.pop()
+        if name == 'title' and elem.get('type') == 'main' and article['title'] is None:
+            article['title'] = text_of(elem).strip()
+        elif name == 'persName':
+            # scipdf joins every <persName> in the file, reference authors included
+            article['authors'].append(person_name(elem))
+        elif name == 'date' and article['pub_date'] is None and 'publicationStmt' in path:
+            article['pub_date'] = elem.get('when') or ''
+        elif name == 'idno' and elem.get('type') == 'DOI' and article['doi'] is None:
+            article['doi'] = text_of(elem)
+        elif name == 'abstract' and not article['abstract']:
+            article['abstract'] = convert_abstract(elem)
+        elif name == 'formula':
+            formula = convert_formula(elem)
+            if formula is not None:
+                article['formulas'].append(formula)
+            if not section_divs:
+                elem.clear()
+        elif name == 'figure':
+            article['figures'].append(convert_figure(elem))
+            if not section_divs:
+                elem.clear()
+        elif name == 'biblStruct' and in_references == 1:
+            article['references'].append(convert_reference(elem))
+            elem.clear()
+        elif name == 'div' and elem in section_divs:
+            section = convert_section(elem)
+            if section['heading'] != '' or section['text'] != '':
+                article['sections'].append(section)
+            section_divs.discard(elem)
+            elem.clear()
+        elif name == 'div' and elem.get('type') == 'references' and in_references:
+            # only the first references block counts, as in scipdf
+            in_references += 1
+        elif name == 'text':
+            in_text -= 1
+        elif name == 'teiHeader':
+            elem.clear()
+    article['title'] = article['title'] or ''
+    article['authors'] = '; '.join(article['authors'])
+    article['pub_date'] = article['pub_date'] or ''
+    article['doi'] = article['doi'] or ''
+    return article
+
+def benchmark(tei_dir):
+    # Compare against scipdf's BeautifulSoup path on saved GROBID TEI files:
+    # python tei_parser.py <dir with .xml/.tei files>
+    from bs4 import BeautifulSoup
+    from scipdf.pdf.parse_pdf import convert_article_soup_to_dict
+    files = sorted(os.path.join(tei_dir, f) for f in os.listdir(tei_dir) if f.endswith(('.xml', '.tei')))
+    soup_seconds = stream_seconds = 0.0
+    mismatches = 0
+    for path in files:
+        with open(path, 'rb') as f:
+            tei = f.read()
+        start = time.perf_counter()
+        expected = convert_article_soup_to_dict(BeautifulSoup(tei, 'lxml'))
+        soup_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        actual = tei_to_dict(tei)
+        stream_seconds += time.perf_counter() - start
+        for key in ('title', 'abstract', 'sections'):
+            if expected[key] != actual[key]:
+                mismatches += 1
+                print(f"{path}: '{key}' differs")
+    print(f"{len(files)} TEI files, {mismatches} mismatches in title/abstract/sections")
+    if files:
+        print(f"BeautifulSoup: {soup_seconds / len(files) * 1000:.1f} ms/paper")
+        print(f"Streaming:     {stream_seconds / len(files) * 1000:.1f} ms/paper")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python tei_parser.py <tei_directory>")
+        sys.exit(1)
+    benchmark(sys.argv[1])
@@ -0,0 +1,105 @@
+import os
+import json
+import threading
+import importlib.util
+import http.server
+import pytest
+
+# 2_pdf_parser.py imports scipdf at module level
+pytest.importorskip('scipdf')
+
+# The concurrent downloader of 2_pdf_parser.py against a local HTTP stub that
+# serves sample PDFs. The parse stage is replaced by a stub GROBID pool, so no
+# GROBID instance is needed.
+# python -m pytest test_downloader.py
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_PDF = b"%PDF-1.4\n" + b"0" * 200000 + b"\n%%EOF\n"
+
+def load_parser():
+    spec = importlib.util.spec_from_file_location('pdf_parser', os.path.join(HERE, '2_pdf_parser.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    # /<name>.pdf serves SAMPLE_PDF, /throttled.pdf answers 429 once,
+    # anything else is a 404
+    throttled = set()
+
+    def do_GET(self):
+        if self.path == '/throttled.pdf' and self.path not in self.throttled:
+            self.throttled.add(self.path)
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.end_headers()
+            return
+        if not self.path.endswith('.pdf') or 'missing' in self.path:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(SAMPLE_PDF)))
+        self.end_headers()
+        self.wfile.write(SAMPLE_PDF)
+
+    def log_message(self, *args):
+        pass
+
+class StubGrobid:
+    def parse(self, pdf_file):
+        with open(pdf_file, 'rb') as f:
+            assert f.read() == SAMPLE_PDF
+        return {'title': os.path.basename(pdf_file), 'sections': [{'heading': 'Ethics Statement', 'text': 'e'}]}, None
+
+@pytest.fixture(scope='module')
+def parser():
+    return load_parser()
+
+@pytest.fixture
+def base_url():
+    StubHandler.throttled = set()
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+def test_download_pdf(parser, base_url, tmp_path):
+    session = parser.make_session(2)
+    target = tmp_path / 'paper.pdf'
+    assert parser.download_pdf(f"{base_url}/paper.pdf", str(target), session)
+    assert target.read_bytes() == SAMPLE_PDF
+
+    missing = tmp_path / 'missing.pdf'
+    assert not parser.download_pdf(f"{base_url}/missing.pdf", str(missing), session)
+    assert not missing.exists()
+    assert not (tmp_path / 'missing.pdf.part').exists()
+
+def test_throttled_download_is_retried(parser, base_url, tmp_path):
+    session = parser.make_session(2)
+    rates = parser.RateController(4, max_retries=2, backoff_base=0.01)
+    target = tmp_path / 'throttled.pdf'
+    url = f"{base_url}/throttled.pdf"
+    assert rates.call(url, lambda: parser.download_pdf(url, str(target), session))
+    assert target.read_bytes() == SAMPLE_PDF
+    # one 429 halves the host's limit, the retried success adds 1/limit
+    assert rates.host(url).limit == pytest.approx(2.5)
+
+def test_process_volumes(parser, base_url, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    args = parser.parse_args(['--no-state', '--concurrency', '3', '--queue-size', '1'])
+    volumes = [
+        (str(tmp_path / 'output' / 'v1'), [f"{base_url}/2023.acl-long.1.pdf", f"{base_url}/missing.pdf"]),
+        (str(tmp_path / 'output' / 'v2'), [f"{base_url}/2023.acl-long.2.pdf", f"{base_url}/throttled.pdf"]),
+    ]
+    rates = parser.RateController(args.concurrency, max_retries=2, backoff_base=0.01)
+    parser.process_volumes(volumes, parser.make_session(args.concurrency), args, grobid=StubGrobid(), rates=rates)
+
+    assert sorted(os.listdir(tmp_path / 'output' / 'v1')) == ['2023_acl-long_1.json', '2023_acl-long_1_ethics.json']
+    assert sorted(os.listdir(tmp_path / 'output' / 'v2')) == [
+        '2023_acl-long_2.json', '2023_acl-long_2_ethics.json', 'throttled.json', 'throttled_ethics.json']
+    with open(tmp_path / 'output' / 'v2' / '2023_acl-long_2.json', encoding='utf-8') as f:
+        assert json.load(f)['title'] == '2023_acl-long_2.pdf'
+    with open(tmp_path / 'errors.txt', encoding='utf-8') as f:
+        assert 'missing' in f.read()
@@ -0,0 +1,30 @@
+import time
+from grobid_pool import GrobidPool
+
+# A stub stands in for GROBID: PDFs named slow*.pdf take longer than the
+# pool's timeout, every other PDF parses at once.
+# python -m pytest test_grobid_pool.py
+
+def stub_parse(pdf_file, grobid_url, fast_tei):
+    if pdf_file.startswith('slow'):
+        time.sleep(60)
+    return {'title': pdf_file, 'grobid_url': grobid_url}, None
+
+def test_timed_out_worker_is_respawned():
+    pool = GrobidPool(['http://stub'], stub_parse, timeout=1.0)
+    try:
+        worker = pool.workers[0]
+        first_pid = worker.process.pid
+        article, error = pool.parse('slow.pdf')
+        assert article is None
+        assert 'timeout' in error
+        assert worker.timeouts == 1
+        assert worker.process.pid != first_pid
+        assert worker.process.is_alive()
+        # The respawned worker is ready before the next PDF's timeout starts
+        article, error = pool.parse('paper.pdf')
+        assert error is None
+        assert article == {'title': 'paper.pdf', 'grobid_url': 'http://stub'}
+        assert (worker.parsed, worker.failed) == (1, 1)
+    finally:
+        pool.close()
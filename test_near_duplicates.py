@@ -0,0 +1,33 @@
+from near_duplicates import find_clusters, minhash, split_rows
+
+# python -m pytest test_near_duplicates.py (needs numpy, not pandas)
+
+def halves(keys):
+    middle = len(keys) // 2
+    return keys[:middle], keys[middle:]
+
+def test_split_rows_keeps_groups_together():
+    groups = ['c.txt', 'b.txt', 'c.txt', 'a.txt', 'd.txt', 'b.txt']
+    train_rows, test_rows = split_rows(groups, halves)
+    assert sorted(train_rows + test_rows) == list(range(len(groups)))
+    # keys in first-appearance order: c, b | a, d
+    assert train_rows == [0, 2, 1, 5]
+    assert test_rows == [3, 4]
+    assert not {groups[i] for i in train_rows} & {groups[i] for i in test_rows}
+
+def test_split_rows_without_clusters_is_per_row():
+    # Same rows as splitting the files themselves, in walk order
+    groups = ['z', 'x', 'y']
+    split = lambda keys: (keys[:2], keys[2:])
+    train_rows, test_rows = split_rows(groups, split)
+    assert ([groups[i] for i in train_rows], [groups[i] for i in test_rows]) == split(groups)
+    assert (train_rows, test_rows) == ([0, 1], [2])
+
+def test_short_texts_are_not_clustered():
+    text = ' '.join(f"word{i}" for i in range(200))
+    names = ['empty.txt', 'blank.txt', 'paper.txt', 'copy.txt']
+    signatures = [minhash(''), minhash('  \n '), minhash(text), minhash(text)]
+    assert signatures[0] is None and signatures[1] is None
+    kept = [i for i, signature in enumerate(signatures) if signature is not None]
+    clusters = find_clusters([names[i] for i in kept], [signatures[i] for i in kept])
+    assert clusters == [['copy.txt', 'paper.txt']]
@@ -0,0 +1,114 @@
+import os
+import json
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from shard_store import iter_volume, list_volumes
+
+# JSON -> text rendering shared by the 5_*.py scripts. A mode is a template:
+#   full      title, authors and abstract, then every kept section
+#   better    title and kept sections, ethics sections repeated after SEPARATOR
+#   woethics  title and kept sections, ethics sections dropped
+# Each article is decoded once and rendered in every requested mode, so the
+# with- and without-ethics corpora come out of the same pass.
+
+MODES = {
+    'full': {'header': True, 'ethics': 'inline'},
+    'better': {'header': False, 'ethics': 'end'},
+    'woethics': {'header': False, 'ethics': 'drop'},
+}
+SEPARATOR = "SEPARATOR\n\n"
+
+def render(json_data, mode, excluded_sections):
+    template = MODES[mode]
+    content = []
+    ethics_sections = []
+    if 'title' in json_data:
+        content.append(f"Title: {json_data['title']}\n")
+    if template['header']:
+        if 'authors' in json_data:
+            content.append(f"Authors: {json_data['authors']}\n")
+        if 'abstract' in json_data:
+            content.append(f"Abstract: {json_data['abstract']}\n\n")
+
+    for section in json_data.get('sections', []):
+        heading = section['heading']
+        if heading in excluded_sections:
+            continue
+        section_content = f"{heading}\n{section['text']}\n\n"
+        if template['ethics'] != 'inline' and 'ethic' in heading.lower():
+            if template['ethics'] == 'drop':
+                continue
+            ethics_sections.append(section_content)
+        content.append(section_content)
+
+    # Add ethics sections at the end
+    if ethics_sections:
+        content.append(SEPARATOR)
+        content.extend(ethics_sections)
+    return ''.join(content)
+
+def filter_article(json_data, excluded_sections):
+    # Same JSON 4(4)_actually_remove.py would have written to 1(b)_output;
+    # the *_ethics.json lists pass through unchanged
+    if not isinstance(json_data, dict):
+        return json_data
+    filtered = dict(json_data)
+    if 'sections' in filtered:
+        filtered['sections'] = [s for s in filtered['sections'] if s.get('heading') not in excluded_sections]
+    return filtered
+
+def write_text(output_path, content):
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as txt_file:
+        txt_file.write(content)
+
+def render_all(json_data, outputs, relative_path, name, excluded_sections):
+    # outputs maps mode -> output directory
+    for mode, output_dir in outputs.items():
+        write_text(os.path.join(output_dir, relative_path, f"{name}.txt"), render(json_data, mode, excluded_sections))
+
+def is_ethics_file(file):
+    return 'ethics' in file.lower()
+
+def render_file(task, excluded_sections):
+    input_path, relative_path, outputs, filtered_dir = task
+    name = os.path.splitext(os.path.basename(input_path))[0]
+    try:
+        with open(input_path, 'r', encoding='utf-8') as json_file:
+            json_data = json.load(json_file)
+        # *_ethics.json files are not rendered, only mirrored into filtered_dir
+        # (8_copy.py looks for them there)
+        if not is_ethics_file(name):
+            render_all(json_data, outputs, relative_path, name, excluded_sections)
+        if filtered_dir:
+            output_path = os.path.join(filtered_dir, relative_path, os.path.basename(input_path))
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(filter_article(json_data, excluded_sections), f, ensure_ascii=False, separators=(',', ':'))
+    except Exception as e:
+        print(f"Error processing file {input_path}: {str(e)}")
+
+def render_volume(task, excluded_sections):
+    shard_dir, volume, outputs = task
+    for record in iter_volume(shard_dir, volume):
+        try:
+            render_all(record['article'], outputs, volume, record['id'], excluded_sections)
+        except Exception as e:
+            print(f"Error processing record {volume}/{record['id']}: {str(e)}")
+
+def process_json_files(input_dir, outputs, excluded_sections, workers=None, filtered_dir=None):
+    tasks = []
+    for root, dirs, files in os.walk(input_dir):
+        for file in files:
+            if file.endswith('.json') and (filtered_dir or not is_ethics_file(file)):
+                tasks.append((os.path.join(root, file), os.path.relpath(root, input_dir), outputs, filtered_dir))
+    # The matcher travels with each chunk of 64 tasks rather than each file
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for _ in executor.map(partial(render_file, excluded_sections=excluded_sections), tasks, chunksize=64):
+            pass
+
+def process_shards(shard_dir, outputs, excluded_sections, workers=None):
+    tasks = [(shard_dir, volume, outputs) for volume in list_volumes(shard_dir)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for _ in executor.map(partial(render_volume, excluded_sections=excluded_sections), tasks):
+            pass